@@ -0,0 +1,63 @@
+import random
+from array import array
+
+from machine_theory import DFA, CompiledDFA
+
+
+def symbols(count):
+    # Printable ASCII while it lasts, then characters past latin-1.
+    if count <= 94:
+        return [chr(ord('!') + i) for i in range(count)]
+    return [chr(0x100 + i) for i in range(count)]
+
+
+def _dfa(num_states, num_symbols, table, accepting):
+    return DFA.from_compiled(CompiledDFA(range(num_states), symbols(num_symbols), table, 0, accepting))
+
+
+def random_dfa(num_states, num_symbols=2, seed=0, accept_ratio=0.5):
+    # Complete DFA with uniformly random transitions and accept states.
+    rng = random.Random(seed)
+    table = array('l', [rng.randrange(num_states) for _ in range(num_states * num_symbols)])
+    accepting = bytearray(1 if rng.random() < accept_ratio else 0 for _ in range(num_states))
+    return _dfa(num_states, num_symbols, table, accepting)
+
+
+def chain_dfa(num_states, num_symbols=2, seed=0):
+    # Accepts only the first symbol repeated num_states - 2 times; every other
+    # move falls into the last state, which is a dead state.
+    dead = num_states - 1
+    table = array('l', [dead]) * (num_states * num_symbols)
+    for q in range(num_states - 1):
+        table[q * num_symbols] = min(q + 1, dead)
+    accepting = bytearray(num_states)
+    accepting[max(num_states - 2, 0)] = 1
+    return _dfa(num_states, num_symbols, table, accepting)
+
+
+def dense_cyclic_dfa(num_states, num_symbols=4, seed=0):
+    # Strongly connected: symbol j moves q to q + 1 + j * stride, with a random
+    # stride, so every state lies on many cycles.
+    rng = random.Random(seed)
+    stride = rng.randrange(1, max(num_states, 2))
+    table = array('l', [(q + 1 + j * stride) % num_states for q in range(num_states) for j in range(num_symbols)])
+    accepting = bytearray(1 if rng.random() < 0.5 else 0 for _ in range(num_states))
+    return _dfa(num_states, num_symbols, table, accepting)
+
+
+def large_alphabet_dfa(num_states, num_symbols=1000, seed=0):
+    return random_dfa(num_states, num_symbols, seed)
+
+
+GENERATORS = {
+    'random': random_dfa,
+    'chain': chain_dfa,
+    'dense_cyclic': dense_cyclic_dfa,
+    'large_alphabet': large_alphabet_dfa,
+}
+
+
+def random_input(dfa, length, seed=0):
+    rng = random.Random(seed)
+    alphabet = sorted(dfa.alphabet)
+    return ''.join(rng.choice(alphabet) for _ in range(length))
@@ -0,0 +1,139 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+from machine_theory import DFA, CompiledDFA
+
+from .generators import GENERATORS, random_input
+
+INPUT_LENGTH = 100_000
+COUNT_LENGTH = 64
+
+
+def fresh(dfa):
+    # New wrapper and table around the same transitions, so neither the
+    # derived-result cache nor the lazily built rows carry over between runs.
+    c = dfa.compile()
+    return DFA.from_compiled(CompiledDFA(c.states, c.symbols, c.table, c.start, c.accepting))
+
+
+def bench_accepts_input(dfa):
+    text = random_input(dfa, INPUT_LENGTH)
+    dfa.accepts_input('')
+    return lambda: dfa.accepts_input(text)
+
+
+def bench_count_strings_of_length(dfa):
+    return lambda: dfa.count_strings_of_length(COUNT_LENGTH, method='dp')
+
+
+def bench_count_strings_up_to_length(dfa):
+    return lambda: dfa.count_strings_up_to_length(COUNT_LENGTH, method='dp')
+
+
+def bench_minimize(dfa):
+    return dfa.minimize
+
+
+def bench_intersection(dfa):
+    other = fresh(dfa.complement())
+    return lambda: dfa.intersection(other)
+
+
+def bench_union(dfa):
+    other = fresh(dfa.complement())
+    return lambda: dfa.union(other)
+
+
+def bench_difference(dfa):
+    other = fresh(dfa)
+    return lambda: dfa.difference(other)
+
+
+def bench_is_equivalent(dfa):
+    other = fresh(dfa.minimize())
+    return lambda: dfa.is_equivalent(other)
+
+
+def bench_is_disjoint(dfa):
+    other = fresh(dfa.complement())
+    return lambda: dfa.is_disjoint(other)
+
+
+# Each benchmark builds its inputs untimed and returns the call to time.
+BENCHMARKS = {
+    'accepts_input': bench_accepts_input,
+    'count_strings_of_length': bench_count_strings_of_length,
+    'count_strings_up_to_length': bench_count_strings_up_to_length,
+    'minimize': bench_minimize,
+    'intersection': bench_intersection,
+    'union': bench_union,
+    'difference': bench_difference,
+    'is_equivalent': bench_is_equivalent,
+    'is_disjoint': bench_is_disjoint,
+}
+
+
+def run(sizes, generators, benchmarks, repeat, seed, max_transitions, log=sys.stderr):
+    results = []
+    for generator in generators:
+        for size in sizes:
+            dfa = GENERATORS[generator](size, seed=seed)
+            transitions = size * len(dfa.alphabet)
+            if transitions > max_transitions:
+                print(f'skipping {generator} with {size} states: {transitions} transitions', file=log)
+                continue
+            for name in benchmarks:
+                timings = []
+                for _ in range(repeat):
+                    call = BENCHMARKS[name](fresh(dfa))
+                    start = time.perf_counter()
+                    call()
+                    timings.append(time.perf_counter() - start)
+                results.append({
+                    'generator': generator,
+                    'states': size,
+                    'symbols': len(dfa.alphabet),
+                    'benchmark': name,
+                    'repeat': repeat,
+                    'best_seconds': min(timings),
+                    'mean_seconds': sum(timings) / len(timings),
+                })
+                print(f'{generator:>14} {size:>8} {name:<28} {min(timings):.6f}s', file=log)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the DFA algorithms on generated automata.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-transitions', type=int, default=4_000_000,
+                        help='skip automata with more states * symbols than this')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'input_length': INPUT_LENGTH,
+        'count_length': COUNT_LENGTH,
+        'seed': args.seed,
+        'results': run(args.sizes, args.generators, args.benchmarks, args.repeat, args.seed,
+                       args.max_transitions),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+from .cache import DerivedCache
+from .compiled import CompiledDFA, fresh_state_name
+from .dfa import DFA
+from .dfaset import DFASet
+from .incremental import IncrementalAnalysis
+from .keywords import KeywordMatcher
+from .matching import MatcherSession, MatchStats
+from .nfa import NFA, CompiledNFA, LazyDFA
+from .symbols import SymbolRange
+
+__all__ = [
+    'CompiledDFA',
+    'CompiledNFA',
+    'DFA',
+    'DFASet',
+    'DerivedCache',
+    'IncrementalAnalysis',
+    'KeywordMatcher',
+    'LazyDFA',
+    'MatchStats',
+    'MatcherSession',
+    'NFA',
+    'SymbolRange',
+    'fresh_state_name',
+]
@@ -0,0 +1,53 @@
+import sys
+from collections import OrderedDict
+
+from .compiled import CompiledDFA
+
+
+class DerivedCache:
+    # LRU cache for automata and analysis results derived from one DFA. Both
+    # the number of entries and their estimated size in bytes are bounded.
+    def __init__(self, max_entries=128, max_bytes=64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = compute()
+        size = _estimate_size(value)
+        if size <= self.max_bytes:
+            self._entries[key] = (value, size)
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self.size_bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'size_bytes': self.size_bytes}
+
+
+def _estimate_size(value):
+    if isinstance(value, CompiledDFA):
+        return value.num_states * (8 * value.num_symbols + 64) + 64 * value.num_symbols
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    return sys.getsizeof(value)
@@ -0,0 +1,102 @@
+import argparse
+import sys
+from itertools import compress
+
+from .compiled import CompiledDFA
+from .dfa import DFA
+
+_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_NEGATE = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+
+def _line_blocks(stream, block_size):
+    # Lists of lines without their newlines, read block_size bytes at a time.
+    rest = b''
+    for block in iter(lambda: stream.read(block_size), b''):
+        lines = (rest + block).split(b'\n')
+        rest = lines.pop()
+        if lines:
+            yield lines
+    if rest:
+        yield [rest]
+
+
+def _inputs(paths):
+    if not paths:
+        yield sys.stdin.buffer
+        return
+    for path in paths:
+        if path == '-':
+            yield sys.stdin.buffer
+        else:
+            with open(path, 'rb') as f:
+                yield f
+
+
+def classify(args, out):
+    # The table is loaded (and mapped) once; inputs are decoded and classified
+    # a block at a time.
+    compiled = CompiledDFA.load(args.automaton)
+    accepted = total = 0
+    for stream in _inputs(args.inputs):
+        for lines in _line_blocks(stream, args.block_size):
+            flags = compiled.classify([line.decode(args.encoding, 'surrogateescape') for line in lines])
+            if args.print == 'flags':
+                text = bytearray(2 * len(flags))
+                text[0::2] = flags.translate(_DIGITS)
+                text[1::2] = b'\n' * len(flags)
+                out.write(text)
+            elif args.print == 'count':
+                accepted += flags.count(1)
+                total += len(flags)
+            else:
+                if args.print == 'rejected':
+                    flags = flags.translate(_NEGATE)
+                selected = list(compress(lines, flags))
+                if selected:
+                    out.write(b'\n'.join(selected) + b'\n')
+    if args.print == 'count':
+        out.write(f'{accepted} {total}\n'.encode())
+    return 0
+
+
+def compile_automaton(args, out):
+    alphabet = set(args.alphabet) if args.alphabet is not None else None
+    if args.regex is not None:
+        dfa = DFA.from_regex(args.regex, alphabet)
+    else:
+        with open(args.keywords, encoding=args.encoding) as f:
+            keywords = [line.rstrip('\n') for line in f if line.rstrip('\n')]
+        dfa = DFA.from_keywords(keywords, alphabet, contains=not args.suffix)
+    dfa.save(args.output, state_names=not args.no_state_names)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='machine-theory', description='Build and run saved automata.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_classify = commands.add_parser('classify', help='classify one input per line with a saved DFA')
+    parser_classify.add_argument('automaton', help='DFA file written by DFA.save or the compile command')
+    parser_classify.add_argument('inputs', nargs='*', help="input files, '-' or nothing for stdin")
+    parser_classify.add_argument('--print', choices=['flags', 'accepted', 'rejected', 'count'], default='flags',
+                                 help='a 1 or 0 per line, the accepted or rejected lines, or '
+                                      '"<accepted> <total>" (default: flags)')
+    parser_classify.add_argument('--encoding', default='utf-8')
+    parser_classify.add_argument('--block-size', type=int, default=4 << 20, help='bytes read at a time')
+    parser_classify.set_defaults(run=classify)
+
+    parser_compile = commands.add_parser('compile', help='build a DFA and save it')
+    parser_compile.add_argument('output')
+    source = parser_compile.add_mutually_exclusive_group(required=True)
+    source.add_argument('--regex', help='the whole input has to match this pattern')
+    source.add_argument('--keywords', help='file with one keyword per line; inputs containing one match')
+    parser_compile.add_argument('--suffix', action='store_true',
+                                help='with --keywords, inputs have to end with a keyword instead')
+    parser_compile.add_argument('--alphabet', help='the characters of the alphabet, all in one argument')
+    parser_compile.add_argument('--encoding', default='utf-8')
+    parser_compile.add_argument('--no-state-names', action='store_true')
+    parser_compile.set_defaults(run=compile_automaton)
+
+    args = parser.parse_args(argv)
+    return args.run(args, sys.stdout.buffer)
@@ -0,0 +1,1568 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from importlib.util import find_spec
+from itertools import chain, islice
+from math import log2
+from operator import add, itemgetter, mul
+
+from .symbols import SymbolRange, _SymbolClasses, _SymbolIndex, _char_span
+
+
+def fresh_state_name(states, base='SINK'):
+    name = base
+    while name in states:
+        name += "'"
+    return name
+
+
+def _mat_mul(a, b, modulus):
+    columns = list(zip(*b))
+    if modulus is None:
+        return [[sum(map(mul, row, column)) for column in columns] for row in a]
+    return [[sum(map(mul, row, column)) % modulus for column in columns] for row in a]
+
+
+def _row_times_power(row, matrix, n, modulus):
+    # row * matrix**n by repeated squaring.
+    while n:
+        if n & 1:
+            row = _mat_mul([row], matrix, modulus)[0]
+        n >>= 1
+        if n:
+            matrix = _mat_mul(matrix, matrix, modulus)
+    return row
+
+
+def _pick_columns(table, k, columns):
+    # New flat table made of the given columns of a table k columns wide.
+    n = len(table) // k if k else 0
+    if len(columns) == 1:
+        return array('l', table[columns[0]::k])
+    picked = array('l')
+    if columns:
+        pick = itemgetter(*columns)
+        for base in range(0, n * k, k):
+            picked.extend(pick(table[base:base + k]))
+    return picked
+
+
+class CompiledDFA:
+    # States and symbols are interned to dense integers. The transition table is
+    # flat: table[state * num_symbols + symbol] is the index of the next state.
+    # With symbol classes, a column stands for every symbol of its class and
+    # symbols[column] is the least of them; symbol_index maps any member to
+    # its column.
+    # A mapped table lives in a shared file mapping and is stepped through
+    # directly instead of being expanded into per-state rows.
+    def __init__(self, states, symbols, table, start, accepting, mapped=False, classes=None):
+        self.states = states
+        self.symbols = symbols
+        self.table = table
+        self.start = start
+        self.accepting = accepting
+        self.mapped = mapped
+        self.path = None
+        self.num_states = len(states)
+        self.num_symbols = len(symbols)
+        self._classes = classes
+        if classes is None:
+            self.symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        else:
+            self.symbol_index = _SymbolIndex(classes)
+        self._state_index = None
+        self._rows = None
+        self._np_table = None
+        self._reachable = None
+        self._coreachable = None
+        self._word_counts = None
+        self._segments = None
+        self._target_groups = None
+        self._approx_counts = None
+        # Column of every byte value, 255 for those outside the alphabet, for
+        # bytes input and scanning. _byte_codes is the same table kept only
+        # when the alphabet has nothing beyond latin-1, so that str input can
+        # go through it too.
+        self._byte_table = None
+        self._byte_codes = None
+        if self.num_symbols < 255:
+            codes = bytearray([255]) * 256
+            if classes is None:
+                for code, symbol in enumerate(symbols):
+                    if isinstance(symbol, str) and len(symbol) == 1 and ord(symbol) < 256:
+                        codes[ord(symbol)] = code
+                latin = all(isinstance(symbol, str) and len(symbol) == 1 and ord(symbol) < 256 for symbol in symbols)
+            else:
+                for first, last, column in classes.intervals:
+                    if first < 256:
+                        last = min(last, 255)
+                        codes[first:last + 1] = bytes([column]) * (last - first + 1)
+                latin = not classes.extra and all(last < 256 for _, last, _ in classes.intervals)
+            self._byte_table = bytes(codes)
+            if latin:
+                self._byte_codes = self._byte_table
+
+    @classmethod
+    def from_dfa(cls, dfa, alphabet=None):
+        # Transitions are first laid out over atoms, the pieces that the
+        # alphabet is cut into by the transition keys; compress() then merges
+        # the atoms that no state tells apart into symbol classes.
+        items = dfa.alphabet if alphabet is None else alphabet
+        names = set(dfa.states) | set(dfa.transitions) | {dfa.start_state}
+        for moves in dfa.transitions.values():
+            names.update(moves.values())
+        states = sorted(names, key=str)
+        state_index = {state: i for i, state in enumerate(states)}
+
+        spans = []
+        others = set()
+        cuts = set()
+        for item in items:
+            span = _char_span(item)
+            if span is None:
+                others.add(item)
+            else:
+                spans.append(span)
+                cuts.update((span[0], span[1] + 1))
+        keys = set()
+        for moves in dfa.transitions.values():
+            keys.update(moves)
+        for key in keys:
+            span = _char_span(key)
+            if span is not None:
+                cuts.update((span[0], span[1] + 1))
+        with_ranges = any(isinstance(key, SymbolRange) for key in keys)
+        cuts = sorted(cuts)
+        atoms = []
+        spans.sort()
+        covered = []
+        for first, last in spans:
+            if covered and first <= covered[-1][1] + 1:
+                covered[-1][1] = max(covered[-1][1], last)
+            else:
+                covered.append([first, last])
+        for first, last in covered:
+            i = bisect_right(cuts, first)
+            while cuts[i] <= last:
+                atoms.append((first, cuts[i] - 1))
+                first = cuts[i]
+                i += 1
+            atoms.append((first, last))
+        firsts = [first for first, _ in atoms]
+        labels = [chr(first) for first in firsts] + sorted(others)
+        other_index = {symbol: len(atoms) + i for i, symbol in enumerate(labels[len(atoms):])}
+        # Single characters used as keys are atoms of their own.
+        key_index = {chr(first): i for i, (first, last) in enumerate(atoms) if first == last}
+        key_index.update(other_index)
+        m = len(labels)
+
+        table = array('l', [-1]) * (len(states) * m)
+        for state, moves in dfa.transitions.items():
+            base = state_index[state] * m
+            ranges = with_ranges and [(key, next_state) for key, next_state in moves.items()
+                                      if isinstance(key, SymbolRange)]
+            if ranges:
+                # Wider ranges first, so the narrowest key covering a symbol
+                # wins; single symbols are written last.
+                ranges.sort(key=lambda item: -len(item[0]))
+                for key, next_state in ranges:
+                    target = state_index[next_state]
+                    for i in range(bisect_left(firsts, ord(key.first)), bisect_right(firsts, ord(key.last))):
+                        table[base + i] = target
+            for key, next_state in moves.items():
+                i = key_index.get(key)
+                if i is not None:
+                    table[base + i] = state_index[next_state]
+        if -1 in table:
+            # Missing transitions go to an explicit dead state.
+            sink = len(states)
+            states.append(fresh_state_name(names))
+            table = array('l', [sink if t < 0 else t for t in table])
+            table.extend([sink] * m)
+
+        accepting = bytearray(len(states))
+        for state in dfa.accept_states:
+            if state in state_index:
+                accepting[state_index[state]] = 1
+        classes = _SymbolClasses([(first, last, i) for i, (first, last) in enumerate(atoms)], other_index)
+        return cls(states, labels, table, state_index[dfa.start_state], accepting, classes=classes).compress()
+
+    @property
+    def classes(self):
+        if self._classes is None:
+            self._classes = _SymbolClasses.identity(self.symbols)
+        return self._classes
+
+    def class_members(self):
+        # Per column, the symbols and SymbolRanges of its class.
+        if self._classes is None:
+            return [[symbol] for symbol in self.symbols]
+        return self._classes.members(self.num_symbols)
+
+    def class_sizes(self):
+        if self._classes is None:
+            return [1] * self.num_symbols
+        return self._classes.sizes(self.num_symbols)
+
+    def alphabet(self):
+        return set(chain.from_iterable(self.class_members()))
+
+    def same_columns(self, other):
+        return self.symbols == other.symbols and (self._classes is other._classes or self.classes == other.classes)
+
+    def compress(self):
+        # Merges columns that no state tells apart into one symbol class.
+        # Classes are numbered in order of their least symbol.
+        k = self.num_symbols
+        table = self.table
+        groups = {}
+        group_of = [groups.setdefault(bytes(table[code::k]), len(groups)) for code in range(k)]
+        if len(groups) == k and self.symbols == sorted(self.symbols):
+            return self
+        least = {}
+        first_code = {}
+        for code, group in enumerate(group_of):
+            if group not in least or self.symbols[code] < least[group]:
+                least[group] = self.symbols[code]
+            first_code.setdefault(group, code)
+        order = sorted(range(len(groups)), key=least.__getitem__)
+        number = [0] * len(groups)
+        for new, group in enumerate(order):
+            number[group] = new
+        columns = [first_code[group] for group in order]
+        return CompiledDFA(self.states, [least[group] for group in order], _pick_columns(table, k, columns),
+                           self.start, self.accepting, classes=self.classes.remap([number[g] for g in group_of]))
+
+    def isolate(self, symbol):
+        # Table in which symbol has a column of its own, a copy of its class's
+        # column, so that its transitions can change without the rest of the
+        # class. Returns the table and that column.
+        column = self.symbol_index.get(symbol)
+        if column is None:
+            raise KeyError(symbol)
+        if self.class_sizes()[column] == 1:
+            return self, column
+        k = self.num_symbols
+        classes = self.classes
+        if symbol in classes.extra:
+            intervals = classes.intervals
+            extra = dict(classes.extra)
+            extra[symbol] = k
+        else:
+            point = ord(symbol)
+            intervals = []
+            for first, last, c in classes.intervals:
+                if first <= point <= last:
+                    if first < point:
+                        intervals.append((first, point - 1, c))
+                    intervals.append((point, point, k))
+                    if point < last:
+                        intervals.append((point + 1, last, c))
+                else:
+                    intervals.append((first, last, c))
+            extra = classes.extra
+        least = list(self.symbols) + [symbol]
+        if least[column] == symbol:
+            least[column] = min([chr(first) for first, _, c in intervals if c == column]
+                                + [other for other, c in extra.items() if c == column])
+        order = sorted(range(k + 1), key=least.__getitem__)
+        number = [0] * (k + 1)
+        for new, c in enumerate(order):
+            number[c] = new
+        columns = [column if c == k else c for c in order]
+        isolated = CompiledDFA(self.states, [least[c] for c in order], _pick_columns(self.table, k, columns),
+                               self.start, self.accepting, classes=_SymbolClasses(intervals, extra).remap(number))
+        return isolated, number[k]
+
+    @staticmethod
+    def align(tables):
+        # Re-expresses tables compiled over one alphabet on common symbol
+        # classes: the coarsest partition that refines all of theirs.
+        if all(table.same_columns(tables[0]) for table in tables[1:]):
+            return list(tables)
+        cuts = set()
+        for table in tables:
+            for first, last, _ in table.classes.intervals:
+                cuts.update((first, last + 1))
+        cuts = sorted(cuts)
+        pieces = []
+        for first, last, _ in tables[0].classes.intervals:
+            i = bisect_right(cuts, first)
+            while cuts[i] <= last:
+                pieces.append((first, cuts[i] - 1))
+                first = cuts[i]
+                i += 1
+            pieces.append((first, last))
+        keys = {}
+        least = []
+
+        def assign(symbol):
+            key = tuple(table.classes.column(symbol) for table in tables)
+            if None in key:
+                raise ValueError('tables must be compiled over the same alphabet')
+            column = keys.get(key)
+            if column is None:
+                column = keys[key] = len(keys)
+                least.append(symbol)
+            elif symbol < least[column]:
+                least[column] = symbol
+            return column
+
+        intervals = [(first, last, assign(chr(first))) for first, last in pieces]
+        extra = {symbol: assign(symbol) for symbol in tables[0].classes.extra}
+        if len(extra) != len(tables[0].classes.extra) or any(len(table.classes.extra) != len(extra) for table in tables):
+            raise ValueError('tables must be compiled over the same alphabet')
+        order = sorted(range(len(keys)), key=least.__getitem__)
+        number = [0] * len(keys)
+        for new, column in enumerate(order):
+            number[column] = new
+        classes = _SymbolClasses(intervals, extra).remap(number)
+        key_list = list(keys)
+        symbols = [least[column] for column in order]
+        aligned = []
+        for i, table in enumerate(tables):
+            columns = [key_list[column][i] for column in order]
+            aligned.append(CompiledDFA(table.states, symbols, _pick_columns(table.table, table.num_symbols, columns),
+                                       table.start, table.accepting, classes=classes))
+        return aligned
+
+    @property
+    def state_index(self):
+        if self._state_index is None:
+            self._state_index = {state: i for i, state in enumerate(self.states)}
+        return self._state_index
+
+    def rows(self):
+        # Per-state tuples of successors; indexing these is the fastest way to
+        # step the automaton from pure Python.
+        if self._rows is None:
+            k = self.num_symbols
+            table = self.table
+            ints = list(range(self.num_states))
+            self._rows = [tuple([ints[t] for t in table[q * k:(q + 1) * k]]) for q in range(self.num_states)]
+        return self._rows
+
+    def next_state(self, state, code):
+        return self.table[state * self.num_symbols + code]
+
+    def set_transition(self, state, code, target):
+        # Changes the table in place. Rows are kept in step; every other
+        # result derived from the transitions is dropped.
+        self.table[state * self.num_symbols + code] = target
+        if self._rows is not None:
+            row = list(self._rows[state])
+            row[code] = target
+            self._rows[state] = tuple(row)
+        self._reachable = self._coreachable = None
+        self._word_counts = self._target_groups = self._approx_counts = None
+
+    def encode(self, string):
+        # Symbol codes of string, or None if it uses a symbol outside the alphabet.
+        if isinstance(string, (bytes, bytearray, memoryview)):
+            if self._byte_table is None:
+                string = bytes(string).decode('latin-1')
+            else:
+                codes = bytes(string).translate(self._byte_table)
+                return None if 255 in codes else codes
+        if self._byte_codes is not None:
+            try:
+                codes = string.encode('latin-1').translate(self._byte_codes)
+            except UnicodeEncodeError:
+                return None
+            return None if 255 in codes else codes
+        symbol_index = self.symbol_index
+        try:
+            return [symbol_index[char] for char in string]
+        except KeyError:
+            return None
+
+    def run(self, codes, state=None):
+        if state is None:
+            state = self.start
+        if self.mapped and self._rows is None:
+            table = self.table
+            k = self.num_symbols
+            for code in codes:
+                state = table[state * k + code]
+            return state
+        rows = self.rows()
+        for code in codes:
+            state = rows[state][code]
+        return state
+
+    def accepts(self, string):
+        codes = self.encode(string)
+        if codes is None:
+            return False
+        return self.accepting[self.run(codes)] == 1
+
+    def numpy_table(self):
+        if self._np_table is None:
+            import numpy as np
+            self._np_table = np.asarray(self.table).reshape(self.num_states, self.num_symbols)
+        return self._np_table
+
+    def encode_batch(self, strings):
+        # Concatenated symbol codes, per-string lengths and a validity mask for a
+        # list of strings. Invalid strings contribute no codes.
+        import numpy as np
+        valid = np.ones(len(strings), dtype=bool)
+        if self._byte_codes is not None:
+            try:
+                raw = ''.join(strings).encode('latin-1')
+            except UnicodeEncodeError:
+                parts = []
+                for i, string in enumerate(strings):
+                    try:
+                        parts.append(string.encode('latin-1'))
+                    except UnicodeEncodeError:
+                        parts.append(b'')
+                        valid[i] = False
+                raw = b''.join(parts)
+                strings = parts
+            lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+            flat = np.frombuffer(raw.translate(self._byte_codes), dtype=np.uint8)
+            bad = flat == 255
+            if bad.any():
+                valid[np.repeat(np.arange(len(strings)), lengths)[bad]] = False
+                flat = flat[np.repeat(valid, lengths)]
+                lengths[~valid] = 0
+            return flat, lengths, valid
+
+        encoded = []
+        for i, string in enumerate(strings):
+            codes = self.encode(string)
+            if codes is None:
+                codes = []
+                valid[i] = False
+            encoded.append(codes)
+        lengths = np.fromiter(map(len, encoded), dtype=np.intp, count=len(encoded))
+        flat = np.fromiter(chain.from_iterable(encoded), dtype=np.intp, count=int(lengths.sum()))
+        return flat, lengths, valid
+
+    def accepts_many(self, strings, batch_size=16384, stats=None):
+        import numpy as np
+        results = []
+        iterator = iter(strings)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            results.append(self._accepts_batch(batch, stats))
+        if not results:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(results)
+
+    def _accepts_batch(self, batch, stats=None):
+        import numpy as np
+        table = self.numpy_table()
+        accepting = np.frombuffer(self.accepting, dtype=np.uint8).astype(bool)
+        flat, lengths, valid = self.encode_batch(batch)
+
+        max_length = int(lengths.max()) if len(lengths) else 0
+
+        # Longest strings first, so that at column j only a prefix of the rows
+        # is still running. Each column is gathered from flat when it is
+        # reached rather than padding every string to the longest one.
+        order = np.argsort(-lengths, kind='stable')
+        starts = (np.cumsum(lengths) - lengths)[order]
+        active = np.searchsorted(-lengths[order], -np.arange(max_length), side='left')
+
+        # Work on row offsets (state * num_symbols) so each step is one add and
+        # one gather.
+        k = self.num_symbols
+        offsets = table.ravel() * k
+        states = np.full(len(batch), self.start * k, dtype=table.dtype)
+        if stats is not None:
+            visits = np.frombuffer(stats.state_visits, dtype=np.int64)
+            symbol_counts = np.frombuffer(stats.symbol_counts, dtype=np.int64)
+            visits[self.start] += int(valid.sum())
+        for j in range(max_length):
+            if active[j] == 1:
+                # One string left: walk the rest of it without a gather per
+                # symbol.
+                tail = flat[starts[0] + j:starts[0] + lengths[order[0]]].tolist()
+                if stats is None:
+                    states[0] = self.run(tail, int(states[0]) // k) * k
+                else:
+                    table = self.table
+                    state = int(states[0]) // k
+                    path = []
+                    for code in tail:
+                        state = table[state * k + code]
+                        path.append(state)
+                    states[0] = state * k
+                    visits += np.bincount(path, minlength=self.num_states)
+                    symbol_counts += np.bincount(tail, minlength=k)
+                break
+            head = states[:active[j]]
+            column = flat[starts[:active[j]] + j]
+            head += column
+            np.take(offsets, head, out=head)
+            if stats is not None:
+                visits += np.bincount(head // k, minlength=self.num_states)
+                symbol_counts += np.bincount(column, minlength=k)
+        states //= k
+
+        result = np.empty(len(batch), dtype=bool)
+        result[order] = accepting[states]
+        result &= valid
+        if stats is not None:
+            accepted = int(result.sum())
+            unknown = len(batch) - int(valid.sum())
+            stats.transitions += int(lengths.sum())
+            stats.accepted += accepted
+            stats.rejected_unknown_symbol += unknown
+            stats.rejected_non_accepting += len(batch) - accepted - unknown
+        return result
+
+    def _use_matrix_power(self, length, method):
+        if method not in ('auto', 'dp', 'matrix'):
+            raise ValueError(f'unknown counting method {method!r}')
+        if method != 'auto':
+            return method == 'matrix'
+        # DP costs length * |Q| * |Sigma| steps, matrix powering about
+        # 2 * |Q|^3 * log2(length).
+        n = self.num_states
+        return length > 1 and length * n * self.num_symbols > 2 * n ** 3 * log2(length)
+
+    def _weighted_rows(self):
+        # Per state, (successor, number of symbols leading there) pairs; a
+        # column counts once for every symbol in its class.
+        sizes = self.class_sizes()
+        weighted = []
+        for row in self.rows():
+            weights = {}
+            for code, t in enumerate(row):
+                weights[t] = weights.get(t, 0) + sizes[code]
+            weighted.append(list(weights.items()))
+        return weighted
+
+    def _transition_matrix(self, with_counter=False):
+        # matrix[p][q] is the number of symbols that lead from p to q. With
+        # with_counter an extra column accumulates the number of accepted
+        # strings seen so far.
+        n = self.num_states
+        size = n + 1 if with_counter else n
+        matrix = [[0] * size for _ in range(size)]
+        for p, row in enumerate(self._weighted_rows()):
+            for q, weight in row:
+                matrix[p][q] += weight
+                if with_counter and self.accepting[q]:
+                    matrix[p][n] += weight
+        if with_counter:
+            matrix[n][n] = 1
+        return matrix
+
+    def count_of_length(self, length, modulus=None, method='auto'):
+        if self._use_matrix_power(length, method):
+            start_row = [0] * self.num_states
+            start_row[self.start] = 1
+            row = _row_times_power(start_row, self._transition_matrix(), length, modulus)
+            total = sum(count for q, count in enumerate(row) if self.accepting[q])
+            return total if modulus is None else total % modulus
+
+        # counts[q] is the number of strings of the current length that are
+        # accepted when starting from q.
+        rows = self._weighted_rows()
+        counts = list(self.accepting)
+        for _ in range(length):
+            counts = [sum([counts[t] * weight for t, weight in row]) for row in rows]
+            if modulus is not None:
+                counts = [count % modulus for count in counts]
+        return counts[self.start] if modulus is None else counts[self.start] % modulus
+
+    def count_up_to_length(self, max_length, modulus=None, method='auto'):
+        # Accepted strings with length 1 to max_length, as counted by
+        # DFA.count_members.
+        if self._use_matrix_power(max_length, method):
+            start_row = [0] * (self.num_states + 1)
+            start_row[self.start] = 1
+            row = _row_times_power(start_row, self._transition_matrix(True), max_length, modulus)
+            return row[-1] if modulus is None else row[-1] % modulus
+
+        rows = self._weighted_rows()
+        counts = list(self.accepting)
+        total = 0
+        for _ in range(max_length):
+            counts = [sum([counts[t] * weight for t, weight in row]) for row in rows]
+            if modulus is not None:
+                counts = [count % modulus for count in counts]
+            total += counts[self.start]
+        return total if modulus is None else total % modulus
+
+    def word_counts(self, length):
+        # counts[i][q] is the number of words of length i that lead from q to
+        # an accept state, for every i up to length. The table is kept and
+        # grown on demand.
+        counts = self._word_counts
+        if counts is None:
+            counts = self._word_counts = [list(self.accepting)]
+        if len(counts) <= length:
+            rows = self._weighted_rows()
+            previous = counts[-1]
+            for _ in range(length + 1 - len(counts)):
+                previous = [sum([previous[t] * weight for t, weight in row]) for row in rows]
+                counts.append(previous)
+        return counts
+
+    def symbol_segments(self):
+        # The alphabet in symbol order as runs (first, size, column): size
+        # consecutive characters from first on, all in one column. A longer
+        # symbol is a run of size 1 and sorts right after its first character,
+        # so character runs are split there.
+        if self._segments is None:
+            classes = self.classes
+            points = sorted({ord(symbol[0]) + 1 for symbol in classes.extra if isinstance(symbol, str) and symbol})
+            runs = []
+            for first, last, column in classes.intervals:
+                i = bisect_right(points, first)
+                while i < len(points) and points[i] <= last:
+                    runs.append((chr(first), points[i] - first, column))
+                    first = points[i]
+                    i += 1
+                runs.append((chr(first), last - first + 1, column))
+            runs.extend((symbol, 1, column) for symbol, column in classes.extra.items())
+            runs.sort(key=itemgetter(0))
+            self._segments = runs
+        return self._segments
+
+    def rank(self, symbols):
+        # Index of an accepted word among the accepted words of its length,
+        # in lexicographic order of symbols.
+        segments = self.symbol_segments()
+        firsts = [first for first, _, _ in segments]
+        length = len(symbols)
+        counts = self.word_counts(length)
+        rows = self.rows()
+        q = self.start
+        index = 0
+        for i, symbol in enumerate(symbols):
+            j = bisect_right(firsts, symbol) - 1
+            if j < 0:
+                raise ValueError(f'unknown symbol {symbol!r}')
+            first, size, column = segments[j]
+            offset = ord(symbol) - ord(first) if size > 1 and len(symbol) == 1 else 0
+            if offset >= size or (size == 1 and symbol != first):
+                raise ValueError(f'unknown symbol {symbol!r}')
+            remaining = counts[length - i - 1]
+            row = rows[q]
+            index += sum([run * remaining[row[c]] for _, run, c in segments[:j]]) + offset * remaining[row[column]]
+            q = row[column]
+        if not self.accepting[q]:
+            raise ValueError('word is not accepted')
+        return index
+
+    def unrank(self, index, length):
+        # The accepted word of the given length with the given rank.
+        counts = self.word_counts(length)
+        if not 0 <= index < counts[length][self.start]:
+            raise IndexError('rank out of range')
+        segments = self.symbol_segments()
+        rows = self.rows()
+        q = self.start
+        word = []
+        for i in range(length - 1, -1, -1):
+            remaining = counts[i]
+            row = rows[q]
+            for first, size, column in segments:
+                count = remaining[row[column]]
+                if index < size * count:
+                    offset, index = divmod(index, count)
+                    word.append(first if size == 1 else chr(ord(first) + offset))
+                    q = row[column]
+                    break
+                index -= size * count
+        return word
+
+    def _locate(self, symbol, segments, firsts):
+        # (segment, offset, exact): where symbol stands in symbol order, or,
+        # if it is not in the alphabet, where the first symbol after it does.
+        j = bisect_right(firsts, symbol) - 1
+        if j < 0:
+            return 0, 0, False
+        first, size, _ = segments[j]
+        if size == 1:
+            return (j, 0, True) if symbol == first else (j + 1, 0, False)
+        if len(symbol) == 1:
+            offset = ord(symbol) - ord(first)
+            return (j, offset, True) if offset < size else (j + 1, 0, False)
+        return j, ord(symbol[0]) - ord(first) + 1, False
+
+    def _walk(self, depth, weights, exact, after, skip):
+        # Depth-first walk in symbol order over words of up to depth symbols
+        # (exactly depth with exact), yielding the accepted ones as lists of
+        # symbols. weights[r][q] is the number of words the walk would yield
+        # within r more symbols from q: branches without any are not entered,
+        # and skipped words are passed over a branch at a time. Starts after
+        # the symbol sequence after; returns what is left of skip.
+        segments = self.symbol_segments()
+        rows = self.rows()
+        accepting = self.accepting
+        path = []
+        word = []
+        q, j, offset = self.start, 0, 0
+        entered = after is None
+        if after is not None:
+            firsts = [first for first, _, _ in segments]
+            for symbol in after[:depth]:
+                j, offset, found = self._locate(symbol, segments, firsts)
+                if found:
+                    t = rows[q][segments[j][2]]
+                    if weights[depth - len(path) - 1][t]:
+                        path.append((q, j, offset))
+                        word.append(symbol)
+                        q, j, offset = t, 0, 0
+                        continue
+                    offset += 1
+                break
+        while True:
+            if entered and accepting[q] and (not exact or len(path) == depth):
+                if skip:
+                    skip -= 1
+                else:
+                    yield list(word)
+            entered = False
+            if len(path) < depth:
+                weight = weights[depth - len(path) - 1]
+                row = rows[q]
+                while j < len(segments):
+                    first, size, column = segments[j]
+                    count = weight[row[column]]
+                    if count and offset < size:
+                        passed = min(size - offset, skip // count)
+                        skip -= passed * count
+                        offset += passed
+                        if offset < size:
+                            entered = True
+                            break
+                    j += 1
+                    offset = 0
+            if entered:
+                path.append((q, j, offset))
+                first = segments[j][0]
+                word.append(first if segments[j][1] == 1 else chr(ord(first) + offset))
+                q, j, offset = row[segments[j][2]], 0, 0
+            elif path:
+                q, j, offset = path.pop()
+                word.pop()
+                offset += 1
+            else:
+                return skip
+
+    def words_of_length(self, length, after=None, skip=0):
+        # Accepted words of the given length in lexicographic order, one list
+        # of symbols at a time.
+        counts = self.word_counts(length)
+        if counts[length][self.start] > skip or after is not None:
+            return (yield from self._walk(length, counts, True, after, skip))
+        return skip - counts[length][self.start]
+
+    def words(self, after=None, skip=0, max_length=None, lexicographic=False):
+        # Accepted words as lists of symbols, lazily: in shortlex order, or in
+        # lexicographic order among those of at most max_length symbols
+        # (required if the language is infinite). Starts after the symbol
+        # sequence after and leaves out the next skip words. Only the path to
+        # the current word is held, besides word_counts.
+        if not self.coreachable()[self.start]:
+            return
+        if not self._topological_order()[1]:
+            longest = len(self.longest_word_codes())
+            max_length = longest if max_length is None else min(max_length, longest)
+        elif lexicographic and max_length is None:
+            raise ValueError('lexicographic order of an infinite language needs a max_length')
+        if lexicographic:
+            counts = self.word_counts(max_length)
+            weights = [counts[0]]
+            for row in counts[1:max_length]:
+                weights.append(list(map(add, weights[-1], row)))
+            yield from self._walk(max_length, weights, False, after, skip)
+            return
+        length = 0 if after is None else len(after)
+        while max_length is None or length <= max_length:
+            skip = yield from self.words_of_length(length, after if after is not None and length == len(after)
+                                                   else None, skip)
+            length += 1
+
+    def target_groups(self):
+        # Per state, (target, number of symbols, runs) for every target, the
+        # runs being the (first, size) pieces of symbol_segments() that lead
+        # there.
+        if self._target_groups is None:
+            self._target_groups = []
+            for row in self.rows():
+                groups = {}
+                for first, size, column in self.symbol_segments():
+                    group = groups.setdefault(row[column], [0, []])
+                    group[0] += size
+                    group[1].append((first, size))
+                self._target_groups.append([(t, weight, runs) for t, (weight, runs) in groups.items()])
+        return self._target_groups
+
+    def sample(self, length, count, rng):
+        # Exactly uniform accepted words. Each step picks a target group with
+        # probability proportional to the words it leads to, then a symbol of
+        # the group uniformly.
+        if not self.classes.extra and find_spec('numpy') is not None:
+            return self._sample_numpy(length, count, rng)
+        # One random index per word, decoded like unrank.
+        counts = self.word_counts(length)
+        total = counts[length][self.start]
+        if total == 0:
+            raise ValueError(f'no accepted word of length {length}')
+        target_groups = self.target_groups()
+        words = []
+        for _ in range(count):
+            index = rng.randrange(total)
+            q = self.start
+            word = []
+            for i in range(length - 1, -1, -1):
+                remaining = counts[i]
+                for t, weight, runs in target_groups[q]:
+                    block = weight * remaining[t]
+                    if index < block:
+                        break
+                    index -= block
+                if weight == 1:
+                    word.append(runs[0][0])
+                else:
+                    offset, index = divmod(index, remaining[t])
+                    for first, size in runs:
+                        if offset < size:
+                            break
+                        offset -= size
+                    word.append(first if size == 1 else chr(ord(first) + offset))
+                q = t
+            words.append(''.join(word))
+        return words
+
+    def _group_arrays(self):
+        import numpy as np
+        target_groups = self.target_groups()
+        n = self.num_states
+        width = max(len(groups) for groups in target_groups)
+        targets = np.zeros((n, width), dtype=np.intp)
+        weights = np.zeros((n, width), dtype=np.int64)
+        group_base = np.zeros((n, width), dtype=np.int64)
+        run_first = []
+        run_start = []
+        position = 0
+        for q, groups in enumerate(target_groups):
+            for j, (t, weight, runs) in enumerate(groups):
+                targets[q, j] = t
+                weights[q, j] = weight
+                group_base[q, j] = position
+                for first, size in runs:
+                    run_first.append(ord(first))
+                    run_start.append(position)
+                    position += size
+        return (targets, weights, group_base, np.array(run_first, dtype=np.int64),
+                np.array(run_start, dtype=np.int64))
+
+    def approximate_word_counts(self, length):
+        # word_counts as floating point pairs, count = mantissa * 2**exponent,
+        # with a separate exponent for every entry so that nothing underflows.
+        # Each level adds at most width + 2 roundings to the relative error.
+        import numpy as np
+        if self._approx_counts is None:
+            self._approx_counts = ([np.frombuffer(self.accepting, dtype=np.uint8).astype(float)],
+                                   [np.zeros(self.num_states, dtype=np.int64)])
+        mantissas, exponents = self._approx_counts
+        if len(mantissas) <= length:
+            targets, weights = self._group_arrays()[:2]
+            weights = weights.astype(float)
+            for _ in range(length + 1 - len(mantissas)):
+                terms = mantissas[-1][targets] * weights
+                term_exponents = exponents[-1][targets]
+                top = np.where(terms > 0, term_exponents, np.iinfo(np.int64).min).max(axis=1)
+                top[top == np.iinfo(np.int64).min] = 0
+                mantissa, exponent = np.frexp(np.ldexp(terms, term_exponents - top[:, None]).sum(axis=1))
+                mantissas.append(mantissa)
+                exponents.append(exponent + top)
+        return mantissas, exponents
+
+    def _sample_numpy(self, length, count, rng):
+        # All words advance together. A step draws a 53-bit uniform u and
+        # compares it with the group boundaries from approximate_word_counts.
+        # Where u is too close to a boundary for their error bound to decide,
+        # u * total plus a random remainder is compared with the exact
+        # boundaries instead.
+        import numpy as np
+        mantissas, exponents = self.approximate_word_counts(length)
+        if mantissas[length][self.start] == 0:
+            raise ValueError(f'no accepted word of length {length}')
+        target_groups = self.target_groups()
+        targets, weights, group_base, run_first, run_start = self._group_arrays()
+        weights_float = weights.astype(float)
+        width = targets.shape[1]
+        scale = 2.0 ** -53
+        window = (4 * (length + 1) * (width + 2) + 2 * width + 8) * scale
+
+        generator = np.random.default_rng(rng.getrandbits(128))
+        # Boundaries are computed per state when there are fewer states than
+        # words, otherwise per word.
+        per_state = self.num_states <= count
+        flat_targets, flat_weights, flat_base = targets.ravel(), weights.ravel(), group_base.ravel()
+        single_runs = all(size == 1 for groups in target_groups for _, _, runs in groups for _, size in runs)
+        states = np.full(count, self.start, dtype=np.intp)
+        codes = np.empty((count, length), dtype='<u4')
+        for i in range(length, 0, -1):
+            rows = slice(None) if per_state else states
+            successors = targets[rows]
+            terms = np.ldexp(mantissas[i - 1][successors] * weights_float[rows],
+                             exponents[i - 1][successors] - exponents[i][rows][:, None])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                bounds = np.cumsum(terms, axis=1)[:, :-1] / mantissas[i][rows][:, None]
+            if per_state:
+                bounds = bounds[states]
+            u = generator.integers(0, 1 << 53, size=count, dtype=np.int64)
+            uniform = u * scale
+            choice = (bounds <= uniform[:, None]).sum(axis=1)
+            for k in np.flatnonzero((np.abs(bounds - uniform[:, None]) < window).any(axis=1)).tolist():
+                counts = self.word_counts(length)
+                q = int(states[k])
+                position = int(u[k]) * counts[i][q] + rng.randrange(counts[i][q])
+                cumulative = 0
+                for j, (t, weight, _) in enumerate(target_groups[q]):
+                    cumulative += weight * counts[i - 1][t]
+                    if position < cumulative << 53:
+                        choice[k] = j
+                        break
+            chosen = states * width + choice
+            offsets = flat_base[chosen] + generator.integers(0, flat_weights[chosen])
+            if single_runs:
+                codes[:, length - i] = run_first[offsets]
+            else:
+                run = np.searchsorted(run_start, offsets, side='right') - 1
+                codes[:, length - i] = run_first[run] + offsets - run_start[run]
+            states = flat_targets[chosen]
+        text = codes.tobytes().decode('utf-32-le', 'surrogatepass')
+        return [text[k * length:(k + 1) * length] for k in range(count)]
+
+    def reachable(self):
+        # 1 for states that can be reached from the start state.
+        if self._reachable is None:
+            rows = self.rows()
+            seen = bytearray(self.num_states)
+            seen[self.start] = 1
+            stack = [self.start]
+            while stack:
+                for t in rows[stack.pop()]:
+                    if not seen[t]:
+                        seen[t] = 1
+                        stack.append(t)
+            self._reachable = seen
+        return self._reachable
+
+    def coreachable(self):
+        # 1 for states from which some accept state can be reached.
+        if self._coreachable is None:
+            inverse = [self.predecessors(code) for code in range(self.num_symbols)]
+            live = bytearray(self.accepting)
+            queue = deque(q for q in range(self.num_states) if live[q])
+            while queue:
+                t = queue.popleft()
+                for offsets, sources in inverse:
+                    for p in sources[offsets[t]:offsets[t + 1]]:
+                        if not live[p]:
+                            live[p] = 1
+                            queue.append(p)
+            self._coreachable = live
+        return self._coreachable
+
+    def useful(self):
+        # States on some path from the start state to an accept state.
+        return bytearray(a & b for a, b in zip(self.reachable(), self.coreachable()))
+
+    def decode(self, codes):
+        return ''.join([self.symbols[code] for code in codes])
+
+    def shortest_word_codes(self, source=None, targets=None):
+        # Codes of the shortlex-least word leading from source into a state
+        # flagged in targets (the accept states by default), or None.
+        source = self.start if source is None else source
+        targets = self.accepting if targets is None else targets
+        rows = self.rows()
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            q = queue.popleft()
+            if targets[q]:
+                codes = []
+                while parent[q] is not None:
+                    q, code = parent[q]
+                    codes.append(code)
+                return codes[::-1]
+            for code, t in enumerate(rows[q]):
+                if t not in parent:
+                    parent[t] = (q, code)
+                    queue.append(t)
+        return None
+
+    def _topological_order(self):
+        # Kahn's algorithm on the useful states. States left over once no
+        # more have in-degree zero lie on, or below, a cycle.
+        useful = self.useful()
+        rows = self.rows()
+        indegree = [0] * self.num_states
+        for q in range(self.num_states):
+            if useful[q]:
+                for t in rows[q]:
+                    if useful[t]:
+                        indegree[t] += 1
+        order = []
+        stack = [q for q in range(self.num_states) if useful[q] and indegree[q] == 0]
+        while stack:
+            q = stack.pop()
+            order.append(q)
+            for t in rows[q]:
+                if useful[t]:
+                    indegree[t] -= 1
+                    if indegree[t] == 0:
+                        stack.append(t)
+        remaining = [q for q in range(self.num_states) if useful[q] and indegree[q] > 0]
+        return order, remaining
+
+    def loop_witness_codes(self):
+        # (prefix, loop, suffix) such that prefix + loop * i + suffix is
+        # accepted for every i >= 0, or None if the language is finite.
+        order, remaining = self._topological_order()
+        if not remaining:
+            return None
+        left = bytearray(self.num_states)
+        for q in remaining:
+            left[q] = 1
+        predecessor = {}
+        for q in remaining:
+            for code, t in enumerate(self.rows()[q]):
+                if left[t] and t not in predecessor:
+                    predecessor[t] = (q, code)
+
+        # Every remaining state has a remaining predecessor, so walking
+        # backwards must eventually revisit a state.
+        position = {}
+        path = []
+        q = remaining[0]
+        while q not in position:
+            position[q] = len(path)
+            p, code = predecessor[q]
+            path.append(code)
+            q = p
+        loop = path[position[q]:][::-1]
+
+        target = bytearray(self.num_states)
+        target[q] = 1
+        prefix = self.shortest_word_codes(targets=target)
+        suffix = self.shortest_word_codes(source=q)
+        return prefix, loop, suffix
+
+    def longest_word_codes(self):
+        # Codes of a longest accepted word, or None if the language is empty.
+        order, remaining = self._topological_order()
+        if remaining:
+            raise ValueError('language is infinite')
+        if not order:
+            return None
+        rows = self.rows()
+        useful = self.useful()
+        depth = {self.start: 0}
+        parent = {self.start: None}
+        for q in order:
+            if q not in depth:
+                continue
+            for code, t in enumerate(rows[q]):
+                if useful[t] and depth.get(t, -1) < depth[q] + 1:
+                    depth[t] = depth[q] + 1
+                    parent[t] = (q, code)
+        best = max((q for q in depth if self.accepting[q]), key=lambda q: depth[q])
+        codes = []
+        while parent[best] is not None:
+            best, code = parent[best]
+            codes.append(code)
+        return codes[::-1]
+
+    def scan_chunks(self, chunks, delimiter=None, stats=None):
+        # Runs the automaton over a stream of byte chunks and yields the offset
+        # just past every byte that leaves it in an accept state. With a
+        # delimiter, matching restarts from the start state after each one.
+        if self._byte_table is None:
+            raise ValueError('scanning needs an alphabet of fewer than 255 symbol classes')
+        codes_table = bytearray(self._byte_table)
+        if delimiter is not None:
+            if isinstance(delimiter, str):
+                delimiter = delimiter.encode('latin-1')
+            if len(delimiter) != 1:
+                raise ValueError('delimiter must be a single byte')
+            codes_table[delimiter[0]] = 254
+        codes_table = bytes(codes_table)
+        flat = self.mapped and self._rows is None and stats is None
+        rows = self.table if flat else self.rows()
+        if stats is not None:
+            visits = stats.state_visits
+            symbol_counts = stats.symbol_counts
+        k = self.num_symbols
+        accepting = self.accepting
+        live = self.coreachable()
+
+        # -1 is the dead state: an unknown byte was seen, or no accept state is
+        # reachable any more, so nothing can match before the next delimiter.
+        state = self.start if live[self.start] else -1
+        if stats is not None:
+            visits[self.start] += 1
+        base = 0
+        for chunk in chunks:
+            if not isinstance(chunk, bytes):
+                chunk = bytes(chunk)
+            codes = chunk.translate(codes_table)
+            size = len(codes)
+            pos = 0
+            while pos < size:
+                end = codes.find(254, pos) if delimiter is not None else -1
+                if end < 0:
+                    end = size
+                if state >= 0:
+                    stop = codes.find(255, pos, end)
+                    segment = codes[pos:end if stop < 0 else stop]
+                    if stats is not None:
+                        for offset, code in enumerate(segment, base + pos + 1):
+                            state = rows[state][code]
+                            visits[state] += 1
+                            symbol_counts[code] += 1
+                            stats.transitions += 1
+                            if accepting[state]:
+                                yield offset
+                            elif not live[state]:
+                                state = -1
+                                break
+                    elif flat:
+                        for offset, code in enumerate(segment, base + pos + 1):
+                            state = rows[state * k + code]
+                            if accepting[state]:
+                                yield offset
+                            elif not live[state]:
+                                state = -1
+                                break
+                    else:
+                        for offset, code in enumerate(segment, base + pos + 1):
+                            state = rows[state][code]
+                            if accepting[state]:
+                                yield offset
+                            elif not live[state]:
+                                state = -1
+                                break
+                    if stop >= 0:
+                        state = -1
+                if end < size:
+                    state = self.start if live[self.start] else -1
+                    if stats is not None:
+                        visits[self.start] += 1
+                pos = end + 1
+            base += size
+
+    def scan_file(self, path, delimiter=None, chunk_size=1 << 20, stats=None):
+        with open(path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty files and pipes cannot be mapped; read them in chunks.
+                yield from self.scan_chunks(iter(lambda: f.read(chunk_size), b''), delimiter, stats)
+                return
+            with mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                chunks = (mapped[i:i + chunk_size] for i in range(0, len(mapped), chunk_size))
+                yield from self.scan_chunks(chunks, delimiter, stats)
+
+    def predecessors(self, code):
+        # Sources of the transitions on one symbol, grouped by target:
+        # sources[offsets[t]:offsets[t + 1]] are the states that move to t.
+        k = self.num_symbols
+        targets = self.table[code::k]
+        offsets = array('l', bytes(8 * (self.num_states + 1)))
+        for t in targets:
+            offsets[t + 1] += 1
+        for t in range(self.num_states):
+            offsets[t + 1] += offsets[t]
+        fill = array('l', offsets)
+        sources = array('l', bytes(8 * self.num_states))
+        for q, t in enumerate(targets):
+            sources[fill[t]] = q
+            fill[t] += 1
+        return offsets, sources
+
+    def minimize(self):
+        # Hopcroft's partition refinement over the reachable states. Returns
+        # the minimal automaton and, for every old state, the index of its
+        # new state (-1 for unreachable states).
+        return self.quotient(self.partition(self.reachable()))
+
+    def partition(self, members):
+        # Block number of every state with members[q] set, such that two of
+        # them share a block exactly when they accept the same words; -1 for
+        # the other states. Successors of members must be members.
+        k = self.num_symbols
+        inverse = [self.predecessors(code) for code in range(k)]
+
+        accepting_block = [q for q in range(self.num_states) if members[q] and self.accepting[q]]
+        rejecting_block = [q for q in range(self.num_states) if members[q] and not self.accepting[q]]
+        blocks = [set(block) for block in (accepting_block, rejecting_block) if block]
+        block_of = [-1] * self.num_states
+        for b, block in enumerate(blocks):
+            for q in block:
+                block_of[q] = b
+
+        waiting = set()
+        if len(blocks) == 2:
+            waiting.add(0 if len(blocks[0]) <= len(blocks[1]) else 1)
+        while waiting:
+            splitter = list(blocks[waiting.pop()])
+            for offsets, sources in inverse:
+                touched = {}
+                for t in splitter:
+                    for q in sources[offsets[t]:offsets[t + 1]]:
+                        if members[q]:
+                            touched.setdefault(block_of[q], []).append(q)
+                for b, moved in touched.items():
+                    block = blocks[b]
+                    if len(moved) == len(block):
+                        continue
+                    block.difference_update(moved)
+                    new = len(blocks)
+                    blocks.append(set(moved))
+                    for q in moved:
+                        block_of[q] = new
+                    if b in waiting or len(moved) <= len(block):
+                        waiting.add(new)
+                    else:
+                        waiting.add(b)
+        return block_of
+
+    def quotient(self, block_of):
+        # Automaton with one state per block of the reachable states, and the
+        # index of every old state's new state. States are numbered in order
+        # of their first member, whose name they take.
+        k = self.num_symbols
+        number = {}
+        states = []
+        for q in range(self.num_states):
+            b = block_of[q]
+            if b >= 0 and b not in number:
+                number[b] = len(states)
+                states.append(self.states[q])
+        mapping = [number[b] if b >= 0 else -1 for b in block_of]
+
+        table = array('l', bytes(8 * len(states) * k))
+        accepting = bytearray(len(states))
+        for q in range(self.num_states):
+            new = mapping[q]
+            if new >= 0:
+                table[new * k:(new + 1) * k] = array('l', [mapping[t] for t in self.table[q * k:(q + 1) * k]])
+                accepting[new] = self.accepting[q]
+        minimal = CompiledDFA(states, list(self.symbols), table, mapping[self.start], accepting, classes=self._classes)
+        return minimal.compress(), mapping
+
+    def product(self, other, combine):
+        # Worklist construction of the reachable part of the product. Both
+        # tables must use the same columns (see align); pair states are named
+        # (p, q).
+        if not self.same_columns(other):
+            raise ValueError('product needs tables over the same symbols')
+        rows1 = self.rows()
+        rows2 = other.rows()
+        n2 = other.num_states
+        index = {self.start * n2 + other.start: 0}
+        pairs = [(self.start, other.start)]
+        table = array('l')
+        accepting = bytearray()
+        i = 0
+        while i < len(pairs):
+            p, q = pairs[i]
+            i += 1
+            accepting.append(1 if combine(self.accepting[p] == 1, other.accepting[q] == 1) else 0)
+            for t1, t2 in zip(rows1[p], rows2[q]):
+                key = t1 * n2 + t2
+                new = index.get(key)
+                if new is None:
+                    new = index[key] = len(pairs)
+                    pairs.append((t1, t2))
+                table.append(new)
+        states = [(self.states[p], other.states[q]) for p, q in pairs]
+        return CompiledDFA(states, list(self.symbols), table, 0, accepting, classes=self._classes).compress()
+
+    @staticmethod
+    def product_many(tables, combine, monotone=False):
+        # Reachable part of the N-way product, built in one pass. combine gets
+        # a tuple of acceptance flags. If it is monotone, a tuple whose live
+        # components can never satisfy it is sent to a single dead state.
+        symbols = tables[0].symbols
+        if not all(table.same_columns(tables[0]) for table in tables[1:]):
+            raise ValueError('product needs tables over the same symbols')
+        all_rows = [table.rows() for table in tables]
+        all_accepting = [table.accepting for table in tables]
+        all_live = [table.coreachable() for table in tables]
+        k = len(symbols)
+
+        start = tuple(table.start for table in tables)
+        index = {start: 0}
+        tuples = [start]
+        table = array('l')
+        accepting = bytearray()
+        dead = None
+        i = 0
+        while i < len(tuples):
+            current = tuples[i]
+            i += 1
+            if current is None:
+                accepting.append(0)
+                table.extend([dead] * k)
+                continue
+            accepting.append(1 if combine(tuple(flags[q] == 1 for flags, q in zip(all_accepting, current))) else 0)
+            for successor in zip(*[rows[q] for rows, q in zip(all_rows, current)]):
+                new = index.get(successor)
+                if new is None:
+                    if monotone and not combine(tuple(live[q] == 1 for live, q in zip(all_live, successor))):
+                        if dead is None:
+                            dead = len(tuples)
+                            tuples.append(None)
+                        new = index[successor] = dead
+                    else:
+                        new = index[successor] = len(tuples)
+                        tuples.append(successor)
+                table.append(new)
+
+        states = [None if current is None else tuple(t.states[q] for t, q in zip(tables, current))
+                  for current in tuples]
+        if dead is not None:
+            states[dead] = fresh_state_name(set(states))
+        return CompiledDFA(states, list(symbols), table, 0, accepting, classes=tables[0]._classes).compress()
+
+    def equivalent_to(self, other):
+        # Hopcroft-Karp: merge the two start states and follow every pair of
+        # successors that is not already in one union-find class.
+        if not self.same_columns(other):
+            raise ValueError('equivalence needs tables over the same symbols')
+        n1 = self.num_states
+        parent = list(range(n1 + other.num_states))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        rows1 = self.rows()
+        rows2 = other.rows()
+        parent[self.start] = n1 + other.start
+        stack = [(self.start, other.start)]
+        while stack:
+            p, q = stack.pop()
+            if self.accepting[p] != other.accepting[q]:
+                return False
+            for t1, t2 in zip(rows1[p], rows2[q]):
+                r1 = find(t1)
+                r2 = find(n1 + t2)
+                if r1 != r2:
+                    parent[r1] = r2
+                    stack.append((t1, t2))
+        return True
+
+    def find_pair_word(self, other, conflict):
+        # Breadth-first search of the product for the shortlex-least word that
+        # leads to a pair whose acceptance flags satisfy conflict. Returns its
+        # codes, or None if no reachable pair does.
+        if not self.same_columns(other):
+            raise ValueError('product needs tables over the same symbols')
+        rows1 = self.rows()
+        rows2 = other.rows()
+        n2 = other.num_states
+        start = self.start * n2 + other.start
+        parent = {start: None}
+        queue = deque([start])
+        while queue:
+            key = queue.popleft()
+            p, q = divmod(key, n2)
+            if conflict(self.accepting[p] == 1, other.accepting[q] == 1):
+                codes = []
+                while parent[key] is not None:
+                    key, code = parent[key]
+                    codes.append(code)
+                return codes[::-1]
+            for code, (t1, t2) in enumerate(zip(rows1[p], rows2[q])):
+                next_key = t1 * n2 + t2
+                if next_key not in parent:
+                    parent[next_key] = (key, code)
+                    queue.append(next_key)
+        return None
+
+    def complement(self):
+        # The table is complete, so flipping acceptance is enough.
+        accepting = bytearray(1 - flag for flag in self.accepting)
+        return CompiledDFA(self.states, self.symbols, self.table, self.start, accepting, self.mapped, self._classes)
+
+    def classify(self, strings):
+        # One byte per string, 1 if accepted.
+        try:
+            import numpy
+        except ImportError:
+            return bytes([self.accepts(string) for string in strings])
+        return self.accepts_many(strings).view(numpy.uint8).tobytes()
+
+    def accepts_traced(self, string, stats):
+        # Same answer as accepts(), with every step recorded in stats.
+        codes = self.encode(string)
+        if codes is None:
+            stats.rejected_unknown_symbol += 1
+            return False
+        rows = self.rows()
+        visits = stats.state_visits
+        symbol_counts = stats.symbol_counts
+        state = self.start
+        visits[state] += 1
+        for code in codes:
+            state = rows[state][code]
+            visits[state] += 1
+            symbol_counts[code] += 1
+        stats.transitions += len(codes)
+        if self.accepting[state]:
+            stats.accepted += 1
+            return True
+        stats.rejected_non_accepting += 1
+        return False
+
+    def to_dfa(self):
+        from .dfa import DFA
+        return DFA.from_compiled(self)
+
+    def save(self, path, state_names=True):
+        if self.num_states >= 2 ** 31:
+            raise ValueError('too many states for the binary format')
+        symbols = b''.join(struct.pack('<I', len(data)) + data
+                           for data in (symbol.encode('utf-8') for symbol in self.symbols))
+        flags = 1 if state_names else 0
+        if self._classes is not None:
+            # Class intervals and other class members follow the symbols.
+            flags |= 2
+            intervals = self._classes.intervals
+            extra = self._classes.extra
+            symbols += (struct.pack('<I', len(intervals))
+                        + b''.join(struct.pack('<III', *interval) for interval in intervals)
+                        + struct.pack('<I', len(extra))
+                        + b''.join(struct.pack('<II', column, len(data)) + data
+                                   for data, column in ((symbol.encode('utf-8'), column)
+                                                        for symbol, column in extra.items())))
+        names = b''
+        if state_names:
+            encoded = [str(state).encode('utf-8') for state in self.states]
+            offsets = array('Q', [0])
+            for data in encoded:
+                offsets.append(offsets[-1] + len(data))
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            names = offsets.tobytes() + b''.join(encoded)
+        table = array('i', self.table)
+        if sys.byteorder == 'big':
+            table.byteswap()
+        bitmap = bytearray((self.num_states + 7) // 8)
+        for q in range(self.num_states):
+            if self.accepting[q]:
+                bitmap[q >> 3] |= 1 << (q & 7)
+
+        symbols_offset = _FILE_HEADER.size
+        names_offset = symbols_offset + len(symbols)
+        table_offset = _align(names_offset + len(names))
+        accept_offset = table_offset + 4 * len(table)
+        with open(path, 'wb') as f:
+            f.write(_FILE_HEADER.pack(_FILE_MAGIC, _FILE_VERSION, flags, self.num_states,
+                                      self.num_symbols, self.start, symbols_offset, names_offset,
+                                      table_offset, accept_offset))
+            f.write(symbols)
+            f.write(names)
+            f.write(bytes(table_offset - names_offset - len(names)))
+            f.write(table.tobytes())
+            f.write(bitmap)
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        with open(path, 'rb') as f:
+            if use_mmap:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+        view = memoryview(buffer)
+        (magic, version, flags, num_states, num_symbols, start, symbols_offset, names_offset,
+         table_offset, accept_offset) = _FILE_HEADER.unpack_from(view)
+        if magic != _FILE_MAGIC:
+            raise ValueError(f'{path} is not a saved DFA')
+        if version not in (1, _FILE_VERSION):
+            raise ValueError(f'unsupported DFA file version {version}')
+
+        symbols = []
+        pos = symbols_offset
+        for _ in range(num_symbols):
+            (size,) = struct.unpack_from('<I', view, pos)
+            symbols.append(bytes(view[pos + 4:pos + 4 + size]).decode('utf-8'))
+            pos += 4 + size
+        classes = None
+        if flags & 2:
+            (count,) = struct.unpack_from('<I', view, pos)
+            intervals = list(struct.iter_unpack('<III', view[pos + 4:pos + 4 + 12 * count]))
+            pos += 4 + 12 * count
+            (count,) = struct.unpack_from('<I', view, pos)
+            pos += 4
+            extra = {}
+            for _ in range(count):
+                column, size = struct.unpack_from('<II', view, pos)
+                extra[bytes(view[pos + 8:pos + 8 + size]).decode('utf-8')] = column
+                pos += 8 + size
+            classes = _SymbolClasses(intervals, extra)
+        if flags & 1:
+            states = _StateNames(view[names_offset:table_offset], num_states)
+        else:
+            states = range(num_states)
+
+        table = view[table_offset:accept_offset].cast('i')
+        if sys.byteorder == 'big':
+            table = array('i', table)
+            table.byteswap()
+        bitmap = view[accept_offset:accept_offset + (num_states + 7) // 8]
+        accepting = bytearray(b''.join([_BIT_ROWS[byte] for byte in bitmap])[:num_states])
+        compiled = cls(states, symbols, table, start, accepting, mapped=True, classes=classes)
+        compiled.path = os.fspath(path)
+        return compiled
+
+
+_FILE_MAGIC = b'DFAB'
+_FILE_VERSION = 2
+# magic, version, flags, num_states, num_symbols, start state and the offsets
+# of the symbol table, state names, transition table and accept bitmap. Flag 1
+# marks stored state names, flag 2 stored symbol classes (version 2).
+_FILE_HEADER = struct.Struct('<4sHHQQQQQQQ')
+_BIT_ROWS = [bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256)]
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class _StateNames:
+    # Read-only sequence of state names decoded on demand from a saved file.
+    def __init__(self, view, count):
+        offsets = view[:8 * (count + 1)].cast('Q')
+        if sys.byteorder == 'big':
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        self._offsets = offsets
+        self._data = view[8 * (count + 1):]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
@@ -0,0 +1,501 @@
+import os
+import random
+import time
+from collections import deque
+from itertools import islice, product
+
+from .cache import DerivedCache
+from .compiled import CompiledDFA
+from .incremental import IncrementalAnalysis
+from .keywords import KeywordMatcher
+from .matching import MatchStats, MatcherSession
+from .nfa import LazyDFA, NFA
+from .parallel import _classify_file_range, _classify_strings, _init_worker, _line_ranges
+from .symbols import _expand_symbols
+
+
+class DFA:
+    # Assigning states, alphabet, transitions, start_state or accept_states
+    # drops the compiled table and everything derived from it. Editing those
+    # sets and dicts in place is not noticed: use add_transition, or call
+    # invalidate() afterwards.
+    def __init__(self, states, alphabet, transitions, start_state, accept_states):
+        self._states = self._transitions = self._accept_states = None
+        self._compiled = None
+        self._version = 0
+        self._cache = None
+        self._stats = None
+        self._incremental = None
+        self.states = states
+        self.alphabet = alphabet
+        self.transitions = transitions
+        self.start_state = start_state
+        self.accept_states = accept_states
+
+    # Limits for the per-DFA cache of derived automata and analysis results.
+    cache_max_entries = 128
+    cache_max_bytes = 64 << 20
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        # states, transitions and accept_states are only built from the table
+        # when first used.
+        dfa = cls.__new__(cls)
+        dfa._states = dfa._transitions = dfa._accept_states = None
+        dfa._alphabet = compiled.alphabet()
+        dfa._start_state = compiled.states[compiled.start]
+        dfa._compiled = compiled
+        dfa._version = 0
+        dfa._cache = None
+        dfa._stats = None
+        dfa._incremental = None
+        return dfa
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = DerivedCache(self.cache_max_entries, self.cache_max_bytes)
+        return self._cache
+
+    def _cached(self, key, compute):
+        # Keys carry the version stamp, so nothing computed before an
+        # add_transition or invalidate() is ever served after it.
+        return self.cache.get((self._version,) + key, compute)
+
+    def invalidate(self):
+        # Forgets the compiled table, cached results and incremental analysis,
+        # for after the public sets and dicts were edited in place. A DFA
+        # made from a table gets its sets and dicts built from it first.
+        if self._compiled is not None and None in (self._states, self._transitions, self._accept_states):
+            self._materialize()
+        self._compiled = None
+        self._version += 1
+        if self._cache is not None:
+            self._cache.clear()
+        self._incremental = None
+
+    def _materialize(self):
+        compiled = self._compiled
+        names = compiled.states
+        members = compiled.class_members()
+        k = compiled.num_symbols
+        table = compiled.table
+        self._states = set(names)
+        self._transitions = {names[q]: {member: names[table[q * k + a]] for a in range(k) for member in members[a]}
+                             for q in range(compiled.num_states)}
+        self._accept_states = {names[q] for q in range(compiled.num_states) if compiled.accepting[q]}
+
+    @property
+    def states(self):
+        if self._states is None:
+            self._materialize()
+        return self._states
+
+    @states.setter
+    def states(self, states):
+        self.invalidate()
+        self._states = states
+
+    @property
+    def alphabet(self):
+        return self._alphabet
+
+    @alphabet.setter
+    def alphabet(self, alphabet):
+        self.invalidate()
+        self._alphabet = alphabet
+
+    @property
+    def transitions(self):
+        if self._transitions is None:
+            self._materialize()
+        return self._transitions
+
+    @transitions.setter
+    def transitions(self, transitions):
+        self.invalidate()
+        self._transitions = transitions
+
+    @property
+    def start_state(self):
+        return self._start_state
+
+    @start_state.setter
+    def start_state(self, start_state):
+        self.invalidate()
+        self._start_state = start_state
+
+    @property
+    def accept_states(self):
+        if self._accept_states is None:
+            self._materialize()
+        return self._accept_states
+
+    @accept_states.setter
+    def accept_states(self, accept_states):
+        self.invalidate()
+        self._accept_states = accept_states
+
+    @classmethod
+    def from_regex(cls, pattern, alphabet=None, lazy=False, max_states=None):
+        # Supports |, *, +, ?, grouping, '.', [...] classes with ranges and
+        # negation, and backslash escapes; the whole input has to match. The
+        # alphabet defaults to the symbols the pattern mentions. With lazy=True
+        # a LazyDFA caching at most max_states states (4096 by default) is
+        # returned instead; otherwise max_states bounds the subset
+        # construction, and the result is minimized.
+        nfa = NFA.from_regex(pattern, alphabet)
+        if lazy:
+            return LazyDFA(nfa, max_states or 4096)
+        return nfa.to_dfa(max_states=max_states, subset_names=False)
+
+    @classmethod
+    def from_keywords(cls, keywords, alphabet=None, contains=True):
+        # Aho-Corasick automaton for the keywords; see KeywordMatcher, which
+        # also reports where each keyword occurs. The alphabet defaults to
+        # every character.
+        return KeywordMatcher(keywords, alphabet).to_dfa(contains)
+
+    def save(self, path, state_names=True):
+        self.compile().save(path, state_names)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls.from_compiled(CompiledDFA.load(path, mmap))
+
+    def __repr__(self):
+        return (f'DFA(states={len(self.states)}, alphabet={sorted(self.alphabet)!r}, '
+                f'start_state={self.start_state!r}, accept_states={len(self.accept_states)})')
+
+    def compile(self, alphabet=None):
+        # With an alphabet other than the DFA's own, symbols the DFA does not
+        # know lead to a dead state; that table lives in the derived cache
+        # rather than in _compiled.
+        if alphabet is not None and set(alphabet) != set(self.alphabet):
+            return self._cached(('compile', frozenset(alphabet)), lambda: CompiledDFA.from_dfa(self, alphabet))
+        if self._compiled is None:
+            self._compiled = CompiledDFA.from_dfa(self)
+        return self._compiled
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def instrument(self, callback=None):
+        # Record transitions, state visits, rejection causes and latency for
+        # accepts_input, accepts_many, scan and scan_file until uninstrument().
+        self._stats = MatchStats(callback)
+        return self._stats
+
+    def uninstrument(self):
+        stats, self._stats = self._stats, None
+        return stats
+
+    def accepts_input(self, input_string):
+        if self._stats is None:
+            return self.compile().accepts(input_string)
+        started = time.perf_counter()
+        result = self._stats.bind(self.compile()).accepts_traced(input_string, self._stats)
+        self._stats.record_call('accepts_input', time.perf_counter() - started, 1)
+        return result
+
+    def accepts_many(self, strings, batch_size=16384):
+        if self._stats is None:
+            return self.compile().accepts_many(strings, batch_size)
+        started = time.perf_counter()
+        result = self._stats.bind(self.compile()).accepts_many(strings, batch_size, self._stats)
+        self._stats.record_call('accepts_many', time.perf_counter() - started, len(result))
+        return result
+
+    def session(self):
+        return MatcherSession(self.compile())
+
+    def accepts_parallel(self, source, workers=None, chunk_size=65536, chunk_bytes=4 << 20, encoding='utf-8'):
+        # Classifies an iterable of strings, or a file with one input per line
+        # in the given encoding when source is a path, on a process pool.
+        # Yields one list of results per chunk, in input order. Workers map
+        # the saved table once at start-up; at most two chunks per worker are
+        # in flight at a time.
+        # multiprocessing is imported here as it is slow to import.
+        import multiprocessing
+        import tempfile
+        workers = workers or os.cpu_count() or 1
+        compiled = self.compile()
+        path = compiled.path
+        temporary = None
+        if path is None:
+            fd, temporary = tempfile.mkstemp(suffix='.dfab')
+            os.close(fd)
+            compiled.save(temporary, state_names=False)
+            path = temporary
+        try:
+            if isinstance(source, (str, os.PathLike)):
+                source = os.fspath(source)
+                tasks = ((_classify_file_range, (source, start, end, encoding))
+                         for start, end in _line_ranges(source, chunk_bytes))
+            else:
+                iterator = iter(source)
+                chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+                tasks = ((_classify_strings, (chunk,)) for chunk in chunks)
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(path,)) as pool:
+                pending = deque()
+                for function, args in tasks:
+                    pending.append(pool.apply_async(function, args))
+                    if len(pending) >= 2 * workers:
+                        yield [flag == 1 for flag in pending.popleft().get()]
+                while pending:
+                    yield [flag == 1 for flag in pending.popleft().get()]
+        finally:
+            if temporary is not None:
+                os.remove(temporary)
+
+    def _traced_scan(self, kind, scanner):
+        stats = self._stats
+        started = time.perf_counter()
+        try:
+            yield from scanner
+        finally:
+            stats.record_call(kind, time.perf_counter() - started, 1)
+
+    def scan(self, data, delimiter=None, chunk_size=1 << 20):
+        # A string is scanned as its latin-1 bytes, like the delimiter, so the
+        # offsets are string indices.
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+        chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+        if self._stats is None:
+            return self.compile().scan_chunks(chunks, delimiter)
+        return self._traced_scan('scan', self._stats.bind(self.compile()).scan_chunks(chunks, delimiter, self._stats))
+
+    def scan_file(self, path, delimiter=None, chunk_size=1 << 20):
+        if self._stats is None:
+            return self.compile().scan_file(path, delimiter, chunk_size)
+        scanner = self._stats.bind(self.compile()).scan_file(path, delimiter, chunk_size, self._stats)
+        return self._traced_scan('scan_file', scanner)
+
+    def add_transition(self, state, symbol, next_state):
+        if state in self.transitions:
+            self.transitions[state][symbol] = next_state
+        else:
+            self.transitions[state] = {symbol: next_state}
+        self._version += 1
+        if self._cache is not None:
+            self._cache.clear()
+        if self._incremental is None:
+            self._compiled = None
+        elif self._incremental.add_transition(state, symbol, next_state):
+            self._compiled = self._incremental.compiled
+        else:
+            # New states or symbols: start over from the transitions.
+            self._compiled = None
+            self._incremental = IncrementalAnalysis(self.compile())
+            self._compiled = self._incremental.compiled
+
+    def enable_incremental(self):
+        # From here on add_transition keeps the compiled table, the distances
+        # emptiness is read from and the partition into equivalent states up
+        # to date, revisiting the states whose languages or distances a
+        # change can affect; see IncrementalAnalysis. minimize() still builds
+        # the quotient table in one pass over the states.
+        if self._incremental is None:
+            self._incremental = IncrementalAnalysis(self.compile())
+            self._compiled = self._incremental.compiled
+        return self._incremental
+
+    def disable_incremental(self):
+        incremental, self._incremental = self._incremental, None
+        return incremental
+
+    def count_members(self, max_length):
+        members = list(self.words(after='', max_length=max_length))
+        return len(members), members
+
+    def generate_strings(self, length):
+        return map(''.join, product(sorted(_expand_symbols(self.alphabet)), repeat=length))
+
+    def words(self, limit=None, offset=0, after=None, max_length=None, order='shortlex'):
+        # Accepted strings one at a time, in shortlex order or, with
+        # order='lex', in lexicographic order (which needs max_length if the
+        # language is infinite). Pass the last string of one listing as after
+        # to resume it; offset leaves out that many strings first, counted
+        # rather than generated.
+        if order not in ('shortlex', 'lex'):
+            raise ValueError(f'unknown order {order!r}')
+        words = self.compile().words(after, offset, max_length, order == 'lex')
+        return map(''.join, words if limit is None else islice(words, limit))
+
+    def is_language_empty(self):
+        if self._incremental is not None:
+            return self._incremental.is_empty()
+        compiled = self.compile()
+        return self._cached(('empty',),
+                            lambda: not any(a & b for a, b in zip(compiled.reachable(), compiled.accepting)))
+
+    def is_language_infinite(self):
+        if self._incremental is not None:
+            return self._incremental.is_infinite()
+        return self._cached(('infinite',), lambda: bool(self.compile()._topological_order()[1]))
+
+    def shortest_accepted_word(self):
+        compiled = self.compile()
+        codes = self._cached(('shortest',), compiled.shortest_word_codes)
+        return None if codes is None else compiled.decode(codes)
+
+    def longest_accepted_word(self):
+        compiled = self.compile()
+        codes = self._cached(('longest',), compiled.longest_word_codes)
+        return None if codes is None else compiled.decode(codes)
+
+    def infinite_witness(self):
+        compiled = self.compile()
+        witness = compiled.loop_witness_codes()
+        if witness is None:
+            return None
+        return tuple(compiled.decode(codes) for codes in witness)
+
+    def shortestWord(self, lst=None):
+        if lst is None:
+            word = self.shortest_accepted_word()
+            return 0 if word is None else len(word)
+        if not lst:
+            return 0
+        return len(min(lst, key=len))
+
+    def longestWord(self, lst=None):
+        if lst is None:
+            if self.is_language_infinite():
+                return float('inf')
+            word = self.longest_accepted_word()
+            return 0 if word is None else len(word)
+        if not lst:
+            return 0
+        return len(max(lst, key=len))
+
+    def language_accepts_string(self, x):
+        return self.accepts_input(x)
+
+    def generate_language_examples(self):
+        # The first two accepted and the first two rejected non-empty
+        # strings, looking no further than len(states) + 1 symbols.
+        max_length = len(self.states) + 1
+        accepted = list(self.words(2, after='', max_length=max_length))
+        complement = self._cached(('complement',), lambda: self.compile().complement())
+        rejected = [''.join(word) for word in islice(complement.words('', max_length=max_length), 2)]
+        if len(accepted) == 2 and len(rejected) == 2:
+            return accepted, rejected
+
+    def generate_strings_of_length(self, length):
+        return [''.join(word) for word in self.compile().words_of_length(length)]
+
+    def sample_accepted_words(self, length, count=1, rng=None):
+        # Uniformly random accepted strings of the given length; pass a seeded
+        # random.Random as rng for repeatable samples.
+        return self.compile().sample(length, count, rng or random.Random())
+
+    def rank(self, word):
+        # Position of word among the accepted strings of its length, in
+        # lexicographic order.
+        return self.compile().rank(word)
+
+    def unrank(self, index, length):
+        return ''.join(self.compile().unrank(index, length))
+
+    def count_strings_of_length(self, length, modulus=None, method='auto'):
+        return self._cached(('count', length, modulus),
+                            lambda: self.compile().count_of_length(length, modulus, method))
+
+    def count_strings_up_to_length(self, max_length, modulus=None, method='auto'):
+        return self._cached(('count_up_to', max_length, modulus),
+                            lambda: self.compile().count_up_to_length(max_length, modulus, method))
+
+    def complement(self):
+        # Derived automata are cached as compiled tables; every call gets its
+        # own DFA wrapper, so editing the result cannot touch the cache.
+        return self._cached(('complement',), lambda: self.compile().complement()).to_dfa()
+
+    def _product_table(self, other_dfa, combine):
+        # Only pairs reachable from the start pair are built. Both automata
+        # are completed over the union of the alphabets first.
+        left, right = self._compile_pair(other_dfa)
+        return left.product(right, combine)
+
+    def product(self, other_dfa, combine):
+        return self._product_table(other_dfa, combine).to_dfa()
+
+    @staticmethod
+    def product_many(dfas, combiner='all', minimize=True):
+        # combiner is 'all', 'any', an int k meaning "at least k accept", or a
+        # function from a tuple of acceptance flags to bool. With minimize,
+        # every operand is minimized before the product and the result after.
+        if combiner == 'all':
+            combine, monotone = all, True
+        elif combiner == 'any':
+            combine, monotone = any, True
+        elif isinstance(combiner, int):
+            combine, monotone = (lambda flags: sum(flags) >= combiner), True
+        else:
+            combine, monotone = combiner, False
+
+        symbols = sorted(set().union(*(dfa.alphabet for dfa in dfas)))
+        tables = [dfa.compile(symbols) for dfa in dfas]
+        if minimize:
+            tables = [table.minimize()[0] for table in tables]
+        tables = CompiledDFA.align(tables)
+        result = CompiledDFA.product_many(tables, combine, monotone)
+        if minimize:
+            result = result.minimize()[0]
+        return result.to_dfa()
+
+    def _cached_product(self, name, other_dfa, combine):
+        key = (name, other_dfa, other_dfa._version)
+        return self._cached(key, lambda: self._product_table(other_dfa, combine)).to_dfa()
+
+    def intersection(self, other_dfa):
+        return self._cached_product('intersection', other_dfa, lambda accept1, accept2: accept1 and accept2)
+
+    def union(self, other_dfa):
+        return self._cached_product('union', other_dfa, lambda accept1, accept2: accept1 or accept2)
+
+    def difference(self, other_dfa):
+        return self._cached_product('difference', other_dfa, lambda accept1, accept2: accept1 and not accept2)
+
+    def _compile_pair(self, other_dfa):
+        # Both tables over the union of the alphabets and on common symbol
+        # classes.
+        symbols = sorted(set(self.alphabet) | set(other_dfa.alphabet))
+        return tuple(CompiledDFA.align([self.compile(symbols), other_dfa.compile(symbols)]))
+
+    def _pair_check(self, other_dfa, conflict, return_witness):
+        left, right = self._compile_pair(other_dfa)
+        codes = left.find_pair_word(right, conflict)
+        if not return_witness:
+            return codes is None
+        return codes is None, None if codes is None else left.decode(codes)
+
+    def is_disjoint(self, other_dfa, return_witness=False):
+        # The witness is the shortest string both DFAs accept.
+        return self._pair_check(other_dfa, lambda accept1, accept2: accept1 and accept2, return_witness)
+
+    def is_subset(self, other_dfa, return_witness=False):
+        # The witness is the shortest string accepted here but not by other_dfa.
+        return self._pair_check(other_dfa, lambda accept1, accept2: accept1 and not accept2, return_witness)
+
+    def is_equivalent(self, other_dfa, return_witness=False):
+        # The witness is the shortest string exactly one of the DFAs accepts.
+        left, right = self._compile_pair(other_dfa)
+        if left.equivalent_to(right):
+            return (True, None) if return_witness else True
+        if not return_witness:
+            return False
+        return False, left.decode(left.find_pair_word(right, lambda accept1, accept2: accept1 != accept2))
+
+    def minimize(self, return_mapping=False):
+        compiled = self.compile()
+        minimize = compiled.minimize if self._incremental is None else self._incremental.minimize
+        minimal, mapping = self._cached(('minimize',), minimize)
+        minimal_dfa = minimal.to_dfa()
+        if not return_mapping:
+            return minimal_dfa
+        return minimal_dfa, {compiled.states[q]: minimal.states[new] for q, new in enumerate(mapping) if new >= 0}
+    # Check if the transitions are disjoint 
+     
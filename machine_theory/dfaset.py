@@ -0,0 +1,98 @@
+from array import array
+
+from .compiled import CompiledDFA
+from .symbols import _SymbolClasses
+
+
+class DFASet:
+    # Runs many DFAs over one input in a single pass. Their tables are stacked
+    # into one over joint symbol classes, the pieces of the union of their
+    # alphabets that none of them tells apart, so each input symbol advances
+    # every automaton with one gather. A symbol outside an automaton's
+    # alphabet sends it to a dead state shared by all.
+    def __init__(self, dfas):
+        import numpy as np
+        self.dfas = list(dfas)
+        tables = [dfa if isinstance(dfa, CompiledDFA) else dfa.compile() for dfa in self.dfas]
+
+        cuts = set()
+        for table in tables:
+            for first, last, _ in table.classes.intervals:
+                cuts.update((first, last + 1))
+        cuts = sorted(cuts)
+        keys = {}
+        least = []
+
+        def assign(symbol, key):
+            column = keys.get(key)
+            if column is None:
+                column = keys[key] = len(keys)
+                least.append(symbol)
+            return column
+
+        # Every piece between two cuts lies inside or outside each class
+        # interval; pieces outside all of them are left out.
+        intervals = []
+        for first, end in zip(cuts, cuts[1:]):
+            key = tuple(table.classes.column(chr(first)) for table in tables)
+            if key.count(None) == len(key):
+                continue
+            column = assign(chr(first), key)
+            if intervals and intervals[-1][1] == first - 1 and intervals[-1][2] == column:
+                intervals[-1] = (intervals[-1][0], end - 1, column)
+            else:
+                intervals.append((first, end - 1, column))
+        extra = {}
+        for table in tables:
+            for symbol in table.classes.extra:
+                if symbol not in extra:
+                    extra[symbol] = assign(symbol, tuple(t.classes.extra.get(symbol) for t in tables))
+        k = len(keys)
+
+        sizes = [table.num_states for table in tables]
+        dead = sum(sizes)
+        bases = np.cumsum([0] + sizes[:-1])
+        stacked = np.full((dead + 1, k), dead, dtype=np.intp)
+        for table, base, key_column in zip(tables, bases, zip(*keys) if keys else [()] * len(tables)):
+            known = [column for column, code in enumerate(key_column) if code is not None]
+            codes = [key_column[column] for column in known]
+            stacked[base:base + table.num_states, known] = table.numpy_table()[:, codes] + base
+        accepting = bytearray().join(bytes(table.accepting) for table in tables) + b'\x00'
+        states = [(i, state) for i, table in enumerate(tables) for state in table.states] + [None]
+        self.compiled = CompiledDFA(states, least, array('l', stacked.ravel().tolist()), 0, accepting,
+                                    classes=_SymbolClasses(intervals, extra))
+        self.starts = np.array([table.start for table in tables], dtype=np.intp) + bases
+        self.dead = dead
+        # One column of successors per joint class, so a step is one take.
+        self._columns = list(np.ascontiguousarray(stacked.T))
+
+    def __len__(self):
+        return len(self.dfas)
+
+    def match_stream(self, chunks):
+        # Per DFA, whether it accepts the concatenation of the chunks (strings
+        # or bytes), as a boolean array.
+        import numpy as np
+        compiled = self.compiled
+        columns = self._columns
+        states = self.starts.copy()
+        for chunk in chunks:
+            codes = compiled.encode(chunk)
+            if codes is None:
+                states[:] = self.dead
+                break
+            for code in codes:
+                np.take(columns[code], states, out=states)
+        return np.frombuffer(compiled.accepting, dtype=np.uint8)[states] == 1
+
+    def match_flags(self, string):
+        return self.match_stream([string])
+
+    def match_mask(self, string):
+        # Bit i is set if the i-th DFA accepts.
+        import numpy as np
+        flags = self.match_stream([string])
+        return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+    def matching(self, string):
+        return [dfa for dfa, flag in zip(self.dfas, self.match_stream([string]).tolist()) if flag]
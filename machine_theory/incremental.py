@@ -0,0 +1,385 @@
+from array import array
+from collections import deque
+from heapq import heapify, heappop, heappush
+from math import inf
+
+from .compiled import CompiledDFA
+from .symbols import SymbolRange
+
+
+def _raise_distances(dist, v, into, out_of, changed):
+    # An edge into v went away. States whose every shortest path used it are
+    # found in order of distance, then given new distances from their other
+    # neighbours, nearest first (Ramalingam and Reps). Distance 0 marks the
+    # sources, which never lose theirs.
+    d = dist[v]
+    if d == 0 or d == inf or any(dist[u] + 1 == d for u in into(v)):
+        return
+    lost = set()
+    heap = [(d, v)]
+    while heap:
+        d, w = heappop(heap)
+        if w in lost or any(dist[u] + 1 == d and u not in lost for u in into(w)):
+            continue
+        lost.add(w)
+        for x in out_of(w):
+            if dist[x] == d + 1 and x not in lost:
+                heappush(heap, (d + 1, x))
+    heap = []
+    for w in lost:
+        dist[w] = min([dist[u] + 1 for u in into(w) if u not in lost], default=inf)
+        if dist[w] < inf:
+            heap.append((dist[w], w))
+    heapify(heap)
+    while heap:
+        d, w = heappop(heap)
+        if d > dist[w]:
+            continue
+        for x in out_of(w):
+            if d + 1 < dist[x]:
+                dist[x] = d + 1
+                heappush(heap, (d + 1, x))
+    changed.update(lost)
+
+
+def _lower_distances(dist, v, d, out_of, changed):
+    # A new edge brings v to distance d; breadth-first from there.
+    dist[v] = d
+    changed.add(v)
+    queue = deque([v])
+    while queue:
+        w = queue.popleft()
+        d = dist[w] + 1
+        for x in out_of(w):
+            if d < dist[x]:
+                dist[x] = d
+                changed.add(x)
+                queue.append(x)
+
+
+class IncrementalAnalysis:
+    # Keeps a private compiled table of a DFA edited with add_transition,
+    # and the analyses below, up to date by repairing only what a changed
+    # transition affects:
+    # - dist[q], the length of a shortest word leading from the start state
+    #   to q, and codist[q], that of a shortest word leading from q to an
+    #   accept state. Emptiness is read off these.
+    # - a cycle through useful states while the language is infinite. Once
+    #   an edit breaks it another is searched for only when asked; while the
+    #   language is finite, a new cycle has to pass through the new edge or
+    #   a state that just became useful, so only those are searched from.
+    # - the partition of the states by the words they accept. Nothing
+    #   changes if the old and new targets were equivalent. Otherwise blocks
+    #   are split, starting from the edited state's, until every block's
+    #   members agree on acceptance and successor blocks again. Any two
+    #   blocks that should now be merged lead, word by word, to the edited
+    #   state and a state newly equivalent to it. Those are looked for among
+    #   the states with the same fingerprint, a hash of the words of up to
+    #   fingerprint_depth symbols they accept, and checked as in Hopcroft and
+    #   Karp; after a merge, so are the predecessors of the states that
+    #   moved.
+    fingerprint_depth = 6
+
+    def __init__(self, compiled):
+        self.compiled = CompiledDFA(list(compiled.states), list(compiled.symbols), array('l', compiled.table),
+                                    compiled.start, bytearray(compiled.accepting), classes=compiled._classes)
+        n = self.compiled.num_states
+        self.predecessors = [{} for _ in range(n)]
+        for q in range(n):
+            for t in self._successors(q):
+                sources = self.predecessors[t]
+                sources[q] = sources.get(q, 0) + 1
+
+        self.dist = [inf] * n
+        _lower_distances(self.dist, self.compiled.start, 0, self._successors, set())
+        self.codist = [inf] * n
+        accepting = [q for q in range(n) if self.compiled.accepting[q]]
+        for q in accepting:
+            self.codist[q] = 0
+        queue = deque(accepting)
+        while queue:
+            t = queue.popleft()
+            for p in self.predecessors[t]:
+                if self.codist[p] == inf:
+                    self.codist[p] = self.codist[t] + 1
+                    queue.append(p)
+
+        self._infinite = None
+        self._cycle = None
+        self.block_of = self.compiled.partition(bytearray([1]) * n)
+        self.members = {}
+        for q, b in enumerate(self.block_of):
+            self.members.setdefault(b, set()).add(q)
+        self.next_block = len(self.members)
+        self._fingerprint_all()
+        self.edits = 0
+        self.reclassified = 0
+        self.equivalence_checks = 0
+
+    def _successors(self, q):
+        k = self.compiled.num_symbols
+        return self.compiled.table[q * k:(q + 1) * k]
+
+    def _sources(self, q):
+        return self.predecessors[q]
+
+    def _signature(self, q):
+        block_of = self.block_of
+        return (self.compiled.accepting[q],) + tuple([block_of[t] for t in self._successors(q)])
+
+    def _fingerprint_all(self):
+        # levels[i][q] hashes the words of up to i symbols accepted from q;
+        # states with the last level in common are indexed together.
+        accepting = self.compiled.accepting
+        levels = [list(accepting)]
+        for _ in range(self.fingerprint_depth):
+            previous = levels[-1]
+            levels.append([hash((accepting[q],) + tuple([previous[t] for t in self._successors(q)]))
+                           for q in range(self.compiled.num_states)])
+        self.levels = levels
+        self.fingerprints = {}
+        for q, value in enumerate(levels[-1]):
+            self.fingerprints.setdefault(value, set()).add(q)
+
+    def _refingerprint(self, q):
+        # Only states at most fingerprint_depth - 1 transitions before q see
+        # the edit within fingerprint_depth symbols; nearer ones at more
+        # levels.
+        accepting = self.compiled.accepting
+        levels = self.levels
+        depth = self.fingerprint_depth
+        distance = {q: 0}
+        ball = [q]
+        for p in ball:
+            if distance[p] < depth - 1:
+                for source in self.predecessors[p]:
+                    if source not in distance:
+                        distance[source] = distance[p] + 1
+                        ball.append(source)
+        last = levels[-1]
+        old = [last[p] for p in ball]
+        for i in range(1, depth + 1):
+            previous = levels[i - 1]
+            level = levels[i]
+            for p in ball:
+                if distance[p] >= i:
+                    break
+                level[p] = hash((accepting[p],) + tuple([previous[t] for t in self._successors(p)]))
+        for p, value in zip(ball, old):
+            if last[p] != value:
+                states = self.fingerprints[value]
+                states.discard(p)
+                if not states:
+                    del self.fingerprints[value]
+                self.fingerprints.setdefault(last[p], set()).add(p)
+
+    def add_transition(self, state, symbol, next_state):
+        # Applies the edit and returns True, or returns False if it needs a
+        # state or symbol the table does not have.
+        compiled = self.compiled
+        q = compiled.state_index.get(state)
+        t = compiled.state_index.get(next_state)
+        if q is None or t is None or isinstance(symbol, SymbolRange):
+            return False
+        code = compiled.symbol_index.get(symbol)
+        if code is None:
+            return False
+        if compiled.class_sizes()[code] > 1:
+            k = compiled.num_symbols
+            for p in range(compiled.num_states):
+                sources = self.predecessors[compiled.table[p * k + code]]
+                sources[p] += 1
+            self.compiled, code = compiled.isolate(symbol)
+            self._fingerprint_all()
+        self.set_transition(q, code, t)
+        return True
+
+    def set_transition(self, q, code, t):
+        k = self.compiled.num_symbols
+        old = self.compiled.table[q * k + code]
+        if old == t:
+            return
+        self.edits += 1
+        changed = set()
+        # Through a self-loop, so that each step only removes or only adds
+        # a way to reach a state; a self-loop shortens no path.
+        if old != q:
+            self._retarget(q, code, q)
+            _raise_distances(self.dist, old, self._sources, self._successors, changed)
+            _raise_distances(self.codist, q, self._successors, self._sources, changed)
+        if t != q:
+            self._retarget(q, code, t)
+            if self.dist[q] + 1 < self.dist[t]:
+                _lower_distances(self.dist, t, self.dist[q] + 1, self._successors, changed)
+            if self.codist[t] + 1 < self.codist[q]:
+                _lower_distances(self.codist, q, self.codist[t] + 1, self._sources, changed)
+
+        if self._infinite:
+            if not self._cycle_intact():
+                self._infinite = self._cycle = None
+        elif self._infinite is not None:
+            self._cycle = self._find_cycle([t] + [v for v in changed if self._useful(v)])
+            self._infinite = self._cycle is not None
+
+        # Equivalent targets leave every language, and so the partition and
+        # the fingerprints, as they were.
+        if self.block_of[old] != self.block_of[t]:
+            self._refingerprint(q)
+            self._split(q)
+            self._merge(q)
+
+    def _retarget(self, q, code, t):
+        k = self.compiled.num_symbols
+        old = self.compiled.table[q * k + code]
+        sources = self.predecessors[old]
+        sources[q] -= 1
+        if not sources[q]:
+            del sources[q]
+        sources = self.predecessors[t]
+        sources[q] = sources.get(q, 0) + 1
+        self.compiled.set_transition(q, code, t)
+
+    def _useful(self, q):
+        return self.dist[q] < inf and self.codist[q] < inf
+
+    def _cycle_intact(self):
+        cycle = self._cycle
+        return all(self._useful(q) and q in self._successors(cycle[i - 1]) for i, q in enumerate(cycle))
+
+    def _find_cycle(self, roots):
+        # Depth-first search through useful states; a back edge closes a
+        # cycle, returned as its list of states.
+        status = {}
+        for root in roots:
+            if root in status or not self._useful(root):
+                continue
+            status[root] = 1
+            path = [root]
+            pending = [iter(self._successors(root))]
+            while pending:
+                for t in pending[-1]:
+                    if not self._useful(t):
+                        continue
+                    seen = status.get(t)
+                    if seen == 1:
+                        return path[path.index(t):]
+                    if seen is None:
+                        status[t] = 1
+                        path.append(t)
+                        pending.append(iter(self._successors(t)))
+                        break
+                else:
+                    status[path.pop()] = 2
+                    pending.pop()
+        return None
+
+    def _move(self, states, b):
+        block_of = self.block_of
+        for q in states:
+            self.members[block_of[q]].discard(q)
+            block_of[q] = b
+        self.members.setdefault(b, set()).update(states)
+        self.reclassified += len(states)
+
+    def _split(self, q):
+        # States whose successors changed block are checked a block at a
+        # time and grouped by signature. The members that were not checked,
+        # or else the largest group, keep the block; the other groups get
+        # new blocks and their predecessors are checked next. This ends with
+        # the coarsest refinement of the old partition in which every block
+        # agrees on acceptance and successor blocks.
+        block_of = self.block_of
+        members = self.members
+        pending = {q}
+        while pending:
+            b = block_of[next(iter(pending))]
+            if len(members[b]) < len(pending):
+                dirty = [p for p in members[b] if p in pending]
+            else:
+                dirty = [p for p in pending if block_of[p] == b]
+            pending.difference_update(dirty)
+            groups = {}
+            for p in dirty:
+                groups.setdefault(self._signature(p), []).append(p)
+            if len(dirty) < len(members[b]):
+                checked = set(dirty)
+                keep = self._signature(next(p for p in members[b] if p not in checked))
+            else:
+                keep = max(groups, key=lambda signature: len(groups[signature]))
+            for signature, group in groups.items():
+                if signature != keep:
+                    self._move(group, self.next_block)
+                    self.next_block += 1
+                    for p in group:
+                        pending.update(self.predecessors[p])
+
+    def _merge(self, q):
+        # Blocks holding a state with the same fingerprint as a checked state
+        # are tried against its block; equivalent blocks are merged into the
+        # largest, and the predecessors of the states that moved are checked
+        # next.
+        block_of = self.block_of
+        pending = {q}
+        while pending:
+            p = pending.pop()
+            candidates = self.fingerprints[self.levels[-1][p]]
+            distinct = set()
+            while True:
+                others = {block_of[s] for s in candidates} - distinct
+                others.discard(block_of[p])
+                if not others:
+                    break
+                other = others.pop()
+                groups = self._equivalent_blocks(block_of[p], other)
+                if not groups:
+                    distinct.add(other)
+                for group in groups:
+                    target = max(group, key=lambda block: len(self.members[block]))
+                    for block in group:
+                        if block != target:
+                            moved = list(self.members[block])
+                            self._move(moved, target)
+                            del self.members[block]
+                            for s in moved:
+                                pending.update(self.predecessors[s])
+
+    def _equivalent_blocks(self, first, second):
+        # Hopcroft-Karp on the blocks: the groups of blocks found equivalent
+        # along the way if first and second accept the same words, else [].
+        self.equivalence_checks += 1
+        parent = {}
+
+        def find(x):
+            while parent.get(x, x) != x:
+                x = parent[x]
+            return x
+
+        queue = deque([(first, second)])
+        while queue:
+            x, y = queue.popleft()
+            x, y = find(x), find(y)
+            if x == y:
+                continue
+            left = self._signature(next(iter(self.members[x])))
+            right = self._signature(next(iter(self.members[y])))
+            if left[0] != right[0]:
+                return []
+            parent[y] = x
+            queue.extend(zip(left[1:], right[1:]))
+        groups = {}
+        for block in parent:
+            groups.setdefault(find(block), {find(block)}).add(block)
+        return list(groups.values())
+
+    def is_empty(self):
+        return self.codist[self.compiled.start] == inf
+
+    def is_infinite(self):
+        if self._infinite is None:
+            self._cycle = self._find_cycle(range(self.compiled.num_states))
+            self._infinite = self._cycle is not None
+        return self._infinite
+
+    def minimize(self):
+        # The same result as CompiledDFA.minimize, read off the partition.
+        return self.compiled.quotient([b if d < inf else -1 for b, d in zip(self.block_of, self.dist)])
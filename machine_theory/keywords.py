@@ -0,0 +1,158 @@
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import chain
+
+from .compiled import CompiledDFA
+from .symbols import SymbolRange, _SymbolClasses, _char_span
+
+
+class KeywordMatcher:
+    # Aho-Corasick automaton for a list of keywords, compiled to a complete
+    # table: row(u) is row(fail(u)) with u's trie children written over it,
+    # so building takes time linear in the total keyword length times the
+    # number of symbol classes. All symbols that occur in no keyword share
+    # one class. States are named by the trie prefix they stand for.
+    def __init__(self, keywords, alphabet=None):
+        self.keywords = list(dict.fromkeys(keywords))
+        if not all(self.keywords):
+            raise ValueError('keywords must be non-empty')
+        chars = sorted(set(chain.from_iterable(self.keywords)))
+        if alphabet is None:
+            alphabet = [SymbolRange('\x00', chr(sys.maxunicode))]
+        covered = []
+        others = set()
+        for item in alphabet:
+            span = _char_span(item)
+            if span is None:
+                others.add(item)
+            else:
+                covered.append(list(span))
+        covered.sort()
+        merged = []
+        for first, last in covered:
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+
+        # One interval per keyword character, the gaps between them go to
+        # the shared class.
+        points = [ord(char) for char in chars]
+        intervals = []
+        gaps = []
+        for first, last in merged:
+            i = bisect_left(points, first)
+            while i < len(points) and points[i] <= last:
+                if first < points[i]:
+                    gaps.append((first, points[i] - 1))
+                intervals.append((points[i], points[i], None))
+                first = points[i] + 1
+                i += 1
+            if first <= last:
+                gaps.append((first, last))
+        if len(intervals) != len(chars):
+            missing = sorted(set(chars) - {chr(first) for first, _, _ in intervals})
+            raise ValueError(f'keywords use symbols outside the alphabet: {missing!r}')
+        labels = list(chars)
+        shared = None
+        if gaps or others:
+            shared = min([chr(first) for first, _ in gaps] + sorted(others))
+            labels.append(shared)
+        labels.sort()
+        column = {label: i for i, label in enumerate(labels)}
+        other = None if shared is None else column[shared]
+        intervals = [(point, point, column[chr(point)]) for point, _, _ in intervals]
+        intervals.extend((first, last, other) for first, last in gaps)
+        intervals.sort()
+        classes = _SymbolClasses(intervals, {symbol: other for symbol in others})
+
+        # Trie, then breadth-first failure links straight into the table.
+        children = [{}]
+        names = ['']
+        terminal = [-1]
+        for index, keyword in enumerate(self.keywords):
+            u = 0
+            for char in keyword:
+                a = column[char]
+                v = children[u].get(a)
+                if v is None:
+                    v = children[u][a] = len(children)
+                    children.append({})
+                    names.append(names[u] + char)
+                    terminal.append(-1)
+                u = v
+            terminal[u] = index
+        n = len(children)
+        k = len(labels)
+        table = array('l', bytes(8 * n * k))
+        fail = [0] * n
+        output = [-1] * n
+        self._next_output = [-1] * len(self.keywords)
+        queue = deque([0])
+        while queue:
+            u = queue.popleft()
+            base = u * k
+            f = fail[u]
+            if u:
+                table[base:base + k] = table[f * k:f * k + k]
+            for a, v in children[u].items():
+                fail[v] = table[f * k + a] if u else 0
+                table[base + a] = v
+                queue.append(v)
+            # Longest keyword ending here, and from each keyword the next
+            # shorter one that is a suffix of it.
+            inherited = output[f] if u else -1
+            if terminal[u] >= 0:
+                output[u] = terminal[u]
+                self._next_output[terminal[u]] = inherited
+            else:
+                output[u] = inherited
+        self._output = array('l', output)
+        accepting = bytearray(1 if match >= 0 else 0 for match in output)
+        self.compiled = CompiledDFA(names, labels, table, 0, accepting, classes=classes)
+
+    def scan_chunks(self, chunks):
+        # Yields (offset, keyword) for every occurrence, overlapping ones
+        # included; offset is just past the last symbol of the occurrence.
+        # Symbols outside the alphabet send the automaton back to the root.
+        compiled = self.compiled
+        rows = compiled.rows()
+        output = self._output
+        next_output = self._next_output
+        keywords = self.keywords
+        state = 0
+        base = 0
+        for chunk in chunks:
+            codes = compiled.encode(chunk)
+            if codes is None:
+                if isinstance(chunk, (bytes, bytearray, memoryview)):
+                    chunk = bytes(chunk).decode('latin-1')
+                codes = [compiled.symbol_index.get(symbol, -1) for symbol in chunk]
+            for offset, code in enumerate(codes, base + 1):
+                state = rows[state][code] if code >= 0 else 0
+                match = output[state]
+                while match >= 0:
+                    yield offset, keywords[match]
+                    match = next_output[match]
+            base += len(codes)
+
+    def scan(self, text):
+        return self.scan_chunks([text])
+
+    def to_dfa(self, contains=True):
+        # With contains, a DFA for "the input contains a keyword": states that
+        # complete a keyword loop to themselves. Otherwise the input must end
+        # with a keyword.
+        from .dfa import DFA
+        compiled = self.compiled
+        if not contains:
+            return DFA.from_compiled(compiled)
+        k = compiled.num_symbols
+        table = array('l', compiled.table)
+        for q in range(compiled.num_states):
+            if compiled.accepting[q]:
+                table[q * k:q * k + k] = array('l', [q]) * k
+        return DFA.from_compiled(CompiledDFA(compiled.states, compiled.symbols, table, 0, compiled.accepting,
+                                             classes=compiled.classes))
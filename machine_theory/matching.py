@@ -0,0 +1,87 @@
+from array import array
+
+
+class MatchStats:
+    # Counters filled in by an instrumented DFA. Per-state and per-symbol
+    # counts are indexed like the compiled table and start over if the DFA
+    # is recompiled. The callback, if any, is called after every matcher call
+    # as callback(kind, seconds, stats).
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.calls = 0
+        self.inputs = 0
+        self.accepted = 0
+        self.rejected_unknown_symbol = 0
+        self.rejected_non_accepting = 0
+        self.transitions = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.compiled = None
+        self.state_visits = array('q')
+        self.symbol_counts = array('q')
+
+    def bind(self, compiled):
+        if compiled is not self.compiled:
+            self.compiled = compiled
+            self.state_visits = array('q', bytes(8 * compiled.num_states))
+            self.symbol_counts = array('q', bytes(8 * compiled.num_symbols))
+        return compiled
+
+    def record_call(self, kind, seconds, inputs):
+        self.calls += 1
+        self.inputs += inputs
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if self.callback is not None:
+            self.callback(kind, seconds, self)
+
+    def hottest_states(self, count=10):
+        ranked = sorted(range(len(self.state_visits)), key=self.state_visits.__getitem__, reverse=True)
+        return [(self.compiled.states[q], self.state_visits[q]) for q in ranked[:count] if self.state_visits[q]]
+
+    def hottest_symbols(self, count=10):
+        ranked = sorted(range(len(self.symbol_counts)), key=self.symbol_counts.__getitem__, reverse=True)
+        return [(self.compiled.symbols[a], self.symbol_counts[a]) for a in ranked[:count] if self.symbol_counts[a]]
+
+    def as_dict(self):
+        return {'calls': self.calls, 'inputs': self.inputs, 'accepted': self.accepted,
+                'rejected_unknown_symbol': self.rejected_unknown_symbol,
+                'rejected_non_accepting': self.rejected_non_accepting, 'transitions': self.transitions,
+                'total_seconds': self.total_seconds, 'max_seconds': self.max_seconds}
+
+
+class MatcherSession:
+    # Incremental matcher over one compiled DFA. Only the current state index
+    # is stored, so many sessions can share one table; -1 means an unknown
+    # symbol was fed and the input can no longer be accepted.
+    __slots__ = ('compiled', '_state')
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self._state = compiled.start
+
+    @property
+    def state(self):
+        if self._state < 0:
+            return None
+        return self.compiled.states[self._state]
+
+    def feed(self, chunk):
+        if self._state < 0:
+            return
+        codes = self.compiled.encode(chunk)
+        if codes is None:
+            self._state = -1
+        else:
+            self._state = self.compiled.run(codes, self._state)
+
+    def is_accepting(self):
+        return self._state >= 0 and self.compiled.accepting[self._state] == 1
+
+    def reset(self):
+        self._state = self.compiled.start
+
+    async def feed_async(self, chunks):
+        async for chunk in chunks:
+            self.feed(chunk)
+        return self.is_accepting()
@@ -0,0 +1,425 @@
+from array import array
+
+from .compiled import CompiledDFA
+from .regex import _RegexParser
+
+
+def _epsilon_closures(epsilon, kept):
+    # Tarjan's algorithm over the epsilon graph. Components come out in
+    # reverse topological order, so every closure a component points to is
+    # already known when the component is finished.
+    n = len(epsilon)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    closure = [0] * n
+    stack = []
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            q, i = work[-1]
+            targets = epsilon[q]
+            if i < len(targets):
+                work[-1] = (q, i + 1)
+                target = targets[i]
+                if index[target] < 0:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, 0))
+                elif on_stack[target]:
+                    low[q] = min(low[q], index[target])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[q])
+            if low[q] == index[q]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    members.append(member)
+                    if member == q:
+                        break
+                bits = 0
+                for member in members:
+                    bits |= 1 << member
+                    for target in epsilon[member]:
+                        bits |= closure[target]
+                bits &= kept
+                for member in members:
+                    closure[member] = bits
+    return closure
+
+
+class CompiledNFA:
+    # States and symbols are interned to dense integers; epsilon[q] lists
+    # epsilon successors and edges[q] holds (symbol codes, target) pairs.
+    # State sets are int bitsets, and moves[q][code] is already
+    # epsilon-closed. Only states with symbol edges and accepting states are
+    # kept in the sets, since the others cannot change what a set does next.
+    def __init__(self, states, symbols, epsilon, edges, starts, accepting):
+        self.states = states
+        self.symbols = symbols
+        self.epsilon = epsilon
+        self.edges = edges
+        self.starts = starts
+        self.num_states = len(states)
+        self.num_symbols = len(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.accept = 0
+        for q in accepting:
+            self.accept |= 1 << q
+        kept = self.accept
+        for q in range(self.num_states):
+            if edges[q]:
+                kept |= 1 << q
+        closure = _epsilon_closures(epsilon, kept)
+        self.moves = []
+        for q in range(self.num_states):
+            row = {}
+            for codes, target in edges[q]:
+                for code in codes:
+                    row[code] = row.get(code, 0) | closure[target]
+            self.moves.append(row)
+        self.start = 0
+        for q in starts:
+            self.start |= closure[q]
+
+    @classmethod
+    def from_nfa(cls, nfa):
+        symbols = sorted(nfa.alphabet)
+        names = set(nfa.states) | set(nfa.transitions) | {nfa.start_state}
+        for moves in nfa.transitions.values():
+            for targets in moves.values():
+                names.update(targets)
+        states = sorted(names, key=str)
+        state_index = {state: i for i, state in enumerate(states)}
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        epsilon = [[] for _ in states]
+        edges = [[] for _ in states]
+        for state, moves in nfa.transitions.items():
+            q = state_index[state]
+            for symbol, targets in moves.items():
+                if symbol == NFA.EPSILON:
+                    epsilon[q].extend(state_index[target] for target in targets)
+                elif symbol in symbol_index:
+                    codes = frozenset((symbol_index[symbol],))
+                    edges[q].extend((codes, state_index[target]) for target in targets)
+        accepting = [state_index[state] for state in nfa.accept_states if state in state_index]
+        return cls(states, symbols, epsilon, edges, [state_index[nfa.start_state]], accepting)
+
+    @classmethod
+    def from_regex(cls, pattern, alphabet=None):
+        parser = _RegexParser(pattern)
+        tree = parser.parse()
+        symbols = sorted(parser.literals if alphabet is None else alphabet)
+        unknown = parser.literals - set(symbols)
+        if alphabet is not None and unknown:
+            raise ValueError(f'pattern uses symbols outside the alphabet: {sorted(unknown)!r}')
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        every = frozenset(range(len(symbols)))
+        epsilon = []
+        edges = []
+
+        def new_state():
+            epsilon.append([])
+            edges.append([])
+            return len(epsilon) - 1
+
+        def build(node):
+            # Returns the (entry, exit) states of the fragment for node.
+            kind = node[0]
+            if kind == 'empty':
+                state = new_state()
+                return state, state
+            if kind == 'symbols':
+                codes = frozenset(symbol_index[char] for char in node[1])
+                entry, exit = new_state(), new_state()
+                edges[entry].append((every - codes if node[2] else codes, exit))
+                return entry, exit
+            if kind == 'concat':
+                entry, exit = build(node[1][0])
+                for item in node[1][1:]:
+                    item_entry, item_exit = build(item)
+                    epsilon[exit].append(item_entry)
+                    exit = item_exit
+                return entry, exit
+            entry, exit = new_state(), new_state()
+            if kind == 'union':
+                for branch in node[1]:
+                    branch_entry, branch_exit = build(branch)
+                    epsilon[entry].append(branch_entry)
+                    epsilon[branch_exit].append(exit)
+                return entry, exit
+            inner_entry, inner_exit = build(node[1])
+            epsilon[entry].append(inner_entry)
+            epsilon[inner_exit].append(exit)
+            if kind in ('star', 'optional'):
+                epsilon[entry].append(exit)
+            if kind in ('star', 'plus'):
+                epsilon[inner_exit].append(inner_entry)
+            return entry, exit
+
+        entry, exit = build(tree)
+        return cls(list(range(len(epsilon))), symbols, epsilon, edges, [entry], [exit])
+
+    def decode(self, subset):
+        names = []
+        while subset:
+            low = subset & -subset
+            names.append(self.states[low.bit_length() - 1])
+            subset ^= low
+        return frozenset(names)
+
+    def accepts(self, string):
+        # Direct simulation: one bitset of live states, no determinization.
+        symbol_index = self.symbol_index
+        step = self.step
+        subset = self.start
+        for symbol in string:
+            code = symbol_index.get(symbol)
+            if code is None:
+                return False
+            subset = step(subset, code)
+            if not subset:
+                return False
+        return subset & self.accept != 0
+
+    def step(self, subset, code):
+        moves = self.moves
+        result = 0
+        while subset:
+            low = subset & -subset
+            result |= moves[low.bit_length() - 1].get(code, 0)
+            subset ^= low
+        return result
+
+    def successors(self, subset):
+        row = [0] * len(self.symbols)
+        moves = self.moves
+        while subset:
+            low = subset & -subset
+            for code, targets in moves[low.bit_length() - 1].items():
+                row[code] |= targets
+            subset ^= low
+        return row
+
+    def to_compiled(self, max_states=None, subset_names=True):
+        # Subset construction from the start set; only reachable subsets get
+        # a state. States are named by the frozenset of NFA states they stand
+        # for, or by their index.
+        subsets = [self.start]
+        ids = {self.start: 0}
+        table = array('l')
+        for subset in subsets:
+            for target in self.successors(subset):
+                index = ids.get(target)
+                if index is None:
+                    if max_states is not None and len(subsets) >= max_states:
+                        raise ValueError(f'subset construction needs more than {max_states} states')
+                    index = ids[target] = len(subsets)
+                    subsets.append(target)
+                table.append(index)
+        accepting = bytearray(1 if subset & self.accept else 0 for subset in subsets)
+        names = [self.decode(subset) for subset in subsets] if subset_names else list(range(len(subsets)))
+        return CompiledDFA(names, list(self.symbols), table, 0, accepting)
+
+
+class LazyDFA:
+    # Determinizes an NFA while matching. Each subset met gets a DFA state
+    # whose row of successors is filled in on first use. Once max_states
+    # states are cached the cache is dropped and rebuilt from the current
+    # subset, so memory stays bounded even when full determinization would
+    # blow up. The NFA is compiled once, when the LazyDFA is made.
+    def __init__(self, nfa, max_states=4096):
+        if max_states < 3:
+            raise ValueError('max_states must be at least 3')
+        self.nfa = nfa
+        self.compiled = nfa.compile()
+        self.alphabet = set(self.compiled.symbols)
+        self.max_states = max_states
+        self.flushes = 0
+        self._clear()
+
+    def _clear(self):
+        self._ids = {}
+        self._subsets = []
+        self._rows = []
+        self._accepting = bytearray()
+        # The start subset is always state 0.
+        self._intern(self.compiled.start)
+
+    def _intern(self, subset):
+        index = self._ids.get(subset)
+        if index is None:
+            index = self._ids[subset] = len(self._subsets)
+            self._subsets.append(subset)
+            self._rows.append([-1] * len(self.compiled.symbols))
+            self._accepting.append(1 if subset & self.compiled.accept else 0)
+        return index
+
+    @property
+    def cached_states(self):
+        return len(self._subsets)
+
+    def accepts_input(self, input_string):
+        symbol_index = self.compiled.symbol_index
+        rows = self._rows
+        state = 0
+        for char in input_string:
+            code = symbol_index.get(char)
+            if code is None:
+                return False
+            row = rows[state]
+            next_state = row[code]
+            if next_state < 0:
+                subset = self._subsets[state]
+                target = self.compiled.step(subset, code)
+                if target not in self._ids and len(self._subsets) >= self.max_states:
+                    self._clear()
+                    self.flushes += 1
+                    rows = self._rows
+                    row = rows[self._intern(subset)]
+                next_state = row[code] = self._intern(target)
+            state = next_state
+        return self._accepting[state] == 1
+
+
+class NFA:
+    # transitions maps a state to {symbol: set of next states}; the symbol
+    # NFA.EPSILON marks epsilon moves and a missing entry means no move.
+    # accepts_input simulates sets of states directly, without determinizing.
+    EPSILON = ''
+
+    # As with DFA, assigning an attribute drops the compiled table; after
+    # editing the sets and dicts in place, call invalidate().
+    def __init__(self, states, alphabet, transitions, start_state, accept_states):
+        self._states = self._transitions = self._accept_states = None
+        self._compiled = None
+        self.states = states
+        self.alphabet = alphabet
+        self.transitions = transitions
+        self.start_state = start_state
+        self.accept_states = accept_states
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        # As with DFA.from_compiled, the dictionaries are built on first use.
+        nfa = cls.__new__(cls)
+        nfa._states = nfa._transitions = nfa._accept_states = None
+        nfa._alphabet = set(compiled.symbols)
+        nfa._start_state = compiled.states[compiled.starts[0]]
+        nfa._compiled = compiled
+        return nfa
+
+    @classmethod
+    def from_regex(cls, pattern, alphabet=None):
+        # Thompson construction; see DFA.from_regex for the syntax.
+        return cls.from_compiled(CompiledNFA.from_regex(pattern, alphabet))
+
+    def invalidate(self):
+        # Lazy sets and dicts are built from the table before it is dropped.
+        if self._compiled is not None and None in (self._states, self._transitions, self._accept_states):
+            self._materialize()
+        self._compiled = None
+
+    def _materialize(self):
+        compiled = self._compiled
+        names = compiled.states
+        symbols = compiled.symbols
+        self._states = set(names)
+        self._transitions = {}
+        for q in range(compiled.num_states):
+            moves = {}
+            for codes, target in compiled.edges[q]:
+                for code in codes:
+                    moves.setdefault(symbols[code], set()).add(names[target])
+            if compiled.epsilon[q]:
+                moves[self.EPSILON] = {names[target] for target in compiled.epsilon[q]}
+            if moves:
+                self._transitions[names[q]] = moves
+        self._accept_states = set(compiled.decode(compiled.accept))
+
+    @property
+    def states(self):
+        if self._states is None:
+            self._materialize()
+        return self._states
+
+    @states.setter
+    def states(self, states):
+        self.invalidate()
+        self._states = states
+
+    @property
+    def alphabet(self):
+        return self._alphabet
+
+    @alphabet.setter
+    def alphabet(self, alphabet):
+        self.invalidate()
+        self._alphabet = alphabet
+
+    @property
+    def start_state(self):
+        return self._start_state
+
+    @start_state.setter
+    def start_state(self, start_state):
+        self.invalidate()
+        self._start_state = start_state
+
+    @property
+    def transitions(self):
+        if self._transitions is None:
+            self._materialize()
+        return self._transitions
+
+    @transitions.setter
+    def transitions(self, transitions):
+        self.invalidate()
+        self._transitions = transitions
+
+    @property
+    def accept_states(self):
+        if self._accept_states is None:
+            self._materialize()
+        return self._accept_states
+
+    @accept_states.setter
+    def accept_states(self, accept_states):
+        self.invalidate()
+        self._accept_states = accept_states
+
+    def __repr__(self):
+        return (f'NFA(states={len(self.states)}, alphabet={sorted(self.alphabet)!r}, '
+                f'start_state={self.start_state!r}, accept_states={len(self.accept_states)})')
+
+    def compile(self):
+        if self._compiled is None:
+            self._compiled = CompiledNFA.from_nfa(self)
+        return self._compiled
+
+    def add_transition(self, state, symbol, next_state):
+        self.transitions.setdefault(state, {}).setdefault(symbol, set()).add(next_state)
+        self._compiled = None
+
+    def accepts_input(self, input_string):
+        return self.compile().accepts(input_string)
+
+    def to_dfa(self, minimize=True, max_states=None, subset_names=True):
+        # Only subsets reachable from the start set become states; max_states
+        # bounds how many. The result is then minimized unless asked not to.
+        from .dfa import DFA
+        dfa = DFA.from_compiled(self.compile().to_compiled(max_states, subset_names))
+        return dfa.minimize() if minimize else dfa
@@ -0,0 +1,43 @@
+import mmap
+import os
+
+from .compiled import CompiledDFA
+
+
+# Table of a pool worker for DFA.accepts_parallel, loaded once per process
+# from a saved DFA file that all workers map.
+_worker_table = None
+
+
+def _init_worker(path):
+    global _worker_table
+    _worker_table = CompiledDFA.load(path)
+
+
+def _classify_strings(strings):
+    return _worker_table.classify(strings)
+
+
+def _classify_file_range(path, start, end, encoding):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+    return _worker_table.classify([line.decode(encoding, 'surrogateescape') for line in lines])
+
+
+def _line_ranges(path, chunk_bytes):
+    # Byte ranges of about chunk_bytes that start and end on line boundaries.
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                end = mapped.find(b'\n', min(start + chunk_bytes, size) - 1)
+                end = size if end < 0 else end + 1
+                yield start, end
+                start = end
@@ -0,0 +1,101 @@
+class _RegexParser:
+    # Recursive descent over
+    #   union := concat ('|' concat)*
+    #   concat := repeat*
+    #   repeat := atom ('*' | '+' | '?')*
+    #   atom := symbol | '\' symbol | '.' | '[' class ']' | '(' union ')'
+    # Nodes are tuples. A 'symbols' node holds its characters and whether the
+    # class is negated; '.' is a negated empty class. Both are resolved
+    # against the alphabet when the NFA is built.
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.pos = 0
+        self.literals = set()
+
+    def error(self, message):
+        return ValueError(f'{message} at position {self.pos} in {self.pattern!r}')
+
+    def peek(self):
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def parse(self):
+        node = self.union()
+        if self.pos < len(self.pattern):
+            raise self.error(f'unexpected {self.pattern[self.pos]!r}')
+        return node
+
+    def union(self):
+        branches = [self.concat()]
+        while self.peek() == '|':
+            self.pos += 1
+            branches.append(self.concat())
+        return branches[0] if len(branches) == 1 else ('union', branches)
+
+    def concat(self):
+        items = []
+        while self.peek() not in (None, '|', ')'):
+            items.append(self.repeat())
+        if not items:
+            return ('empty',)
+        return items[0] if len(items) == 1 else ('concat', items)
+
+    def repeat(self):
+        node = self.atom()
+        while self.peek() in ('*', '+', '?'):
+            node = ({'*': 'star', '+': 'plus', '?': 'optional'}[self.peek()], node)
+            self.pos += 1
+        return node
+
+    def atom(self):
+        char = self.peek()
+        if char == '(':
+            self.pos += 1
+            node = self.union()
+            if self.peek() != ')':
+                raise self.error("missing ')'")
+            self.pos += 1
+            return node
+        if char == '[':
+            self.pos += 1
+            return self.char_class()
+        if char == '.':
+            self.pos += 1
+            return ('symbols', frozenset(), True)
+        if char in ('*', '+', '?', ')', ']'):
+            raise self.error(f'unexpected {char!r}')
+        return ('symbols', frozenset(self.literal()), False)
+
+    def literal(self):
+        char = self.peek()
+        if char == '\\':
+            self.pos += 1
+            char = self.peek()
+        if char is None:
+            raise self.error('unexpected end of pattern')
+        self.pos += 1
+        self.literals.add(char)
+        return char
+
+    def char_class(self):
+        negated = self.peek() == '^'
+        if negated:
+            self.pos += 1
+        chars = set()
+        first = True
+        while self.peek() != ']' or first:
+            if self.peek() is None:
+                raise self.error("missing ']'")
+            low = self.literal()
+            first = False
+            if self.peek() == '-' and self.pos + 1 < len(self.pattern) and self.pattern[self.pos + 1] != ']':
+                self.pos += 1
+                high = self.literal()
+                if high < low:
+                    raise self.error(f'bad range {low!r}-{high!r}')
+                span = {chr(c) for c in range(ord(low), ord(high) + 1)}
+                self.literals.update(span)
+                chars.update(span)
+            else:
+                chars.add(low)
+        self.pos += 1
+        return ('symbols', frozenset(chars), negated)
@@ -0,0 +1,147 @@
+from bisect import bisect_right
+
+
+class SymbolRange:
+    # Inclusive range of single-character symbols. It can stand in an
+    # alphabet or as a transition key for every character it covers; where
+    # keys overlap, the narrowest one applies.
+    __slots__ = ('first', 'last')
+
+    def __init__(self, first, last):
+        if not (isinstance(first, str) and isinstance(last, str) and len(first) == len(last) == 1):
+            raise ValueError('range ends must be single characters')
+        if last < first:
+            raise ValueError(f'empty range {first!r}-{last!r}')
+        self.first = first
+        self.last = last
+
+    def __repr__(self):
+        return f'SymbolRange({self.first!r}, {self.last!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, SymbolRange) and (self.first, self.last) == (other.first, other.last)
+
+    def __hash__(self):
+        return hash((SymbolRange, self.first, self.last))
+
+    def _key(self, other):
+        # Ranges sort among plain symbols by their first character.
+        if isinstance(other, SymbolRange):
+            return (self.first, self.last), (other.first, other.last)
+        return (self.first, self.last), (other, other)
+
+    def __lt__(self, other):
+        mine, theirs = self._key(other)
+        return mine < theirs
+
+    def __gt__(self, other):
+        mine, theirs = self._key(other)
+        return mine > theirs
+
+    def __len__(self):
+        return ord(self.last) - ord(self.first) + 1
+
+    def __iter__(self):
+        return map(chr, range(ord(self.first), ord(self.last) + 1))
+
+    def __contains__(self, symbol):
+        return isinstance(symbol, str) and len(symbol) == 1 and self.first <= symbol <= self.last
+
+
+def _expand_symbols(items):
+    for item in items:
+        if isinstance(item, SymbolRange):
+            yield from item
+        else:
+            yield item
+
+
+def _char_span(item):
+    # Code point range of a single character or SymbolRange, else None.
+    if isinstance(item, SymbolRange):
+        return ord(item.first), ord(item.last)
+    if isinstance(item, str) and len(item) == 1:
+        return ord(item), ord(item)
+    return None
+
+
+class _SymbolClasses:
+    # Assigns every symbol of an alphabet to a table column. Characters are
+    # found by code point among sorted, disjoint intervals (first, last,
+    # column); any other symbol, such as a multi-character string, is looked
+    # up in extra.
+    def __init__(self, intervals, extra):
+        self.intervals = intervals
+        self.extra = extra
+        self._firsts = [first for first, _, _ in intervals]
+
+    @classmethod
+    def identity(cls, symbols):
+        intervals = []
+        extra = {}
+        for column, symbol in enumerate(symbols):
+            span = _char_span(symbol)
+            if span is None:
+                extra[symbol] = column
+            else:
+                intervals.append((span[0], span[1], column))
+        intervals.sort()
+        return cls(intervals, extra)
+
+    def __eq__(self, other):
+        return isinstance(other, _SymbolClasses) and self.intervals == other.intervals and self.extra == other.extra
+
+    def column(self, symbol):
+        if isinstance(symbol, str) and len(symbol) == 1:
+            point = ord(symbol)
+            i = bisect_right(self._firsts, point) - 1
+            if i >= 0 and point <= self.intervals[i][1]:
+                return self.intervals[i][2]
+            return None
+        try:
+            return self.extra.get(symbol)
+        except TypeError:
+            return None
+
+    def members(self, num_columns):
+        members = [[] for _ in range(num_columns)]
+        for first, last, column in self.intervals:
+            members[column].append(chr(first) if first == last else SymbolRange(chr(first), chr(last)))
+        for symbol, column in self.extra.items():
+            members[column].append(symbol)
+        return members
+
+    def sizes(self, num_columns):
+        sizes = [0] * num_columns
+        for first, last, column in self.intervals:
+            sizes[column] += last - first + 1
+        for column in self.extra.values():
+            sizes[column] += 1
+        return sizes
+
+    def remap(self, mapping):
+        return _SymbolClasses([(first, last, mapping[column]) for first, last, column in self.intervals],
+                              {symbol: mapping[column] for symbol, column in self.extra.items()})
+
+
+class _SymbolIndex(dict):
+    # symbol -> column, filled in from the class intervals on first lookup.
+    def __init__(self, classes):
+        super().__init__(classes.extra)
+        self.classes = classes
+
+    def __missing__(self, symbol):
+        column = self.classes.column(symbol)
+        if column is None:
+            raise KeyError(symbol)
+        self[symbol] = column
+        return column
+
+    def get(self, symbol, default=None):
+        try:
+            return self[symbol]
+        except (KeyError, TypeError):
+            return default
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
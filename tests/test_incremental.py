@@ -0,0 +1,43 @@
+import copy
+import random
+
+import pytest
+
+from machine_theory import DFA
+
+
+def fresh(dfa):
+    return DFA(set(dfa.states), set(dfa.alphabet), copy.deepcopy(dfa.transitions), dfa.start_state,
+               set(dfa.accept_states))
+
+
+def random_dfa(rnd, n, symbols, acyclic):
+    transitions = {}
+    for q in range(n):
+        transitions[q] = {}
+        for symbol in symbols:
+            if rnd.random() < .9:
+                transitions[q][symbol] = rnd.randrange(q, n) if acyclic else rnd.randrange(n)
+    return DFA(set(range(n)), set(symbols), transitions, 0, set(rnd.sample(range(n), rnd.randint(0, n))))
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('acyclic', [False, True])
+def test_edits_match_fresh_analysis(seed, acyclic):
+    rnd = random.Random(seed)
+    for _ in range(30):
+        n = rnd.randint(1, 10)
+        symbols = 'abc'[:rnd.randint(1, 3)]
+        dfa = random_dfa(rnd, n, symbols, acyclic)
+        dfa.enable_incremental()
+        for _ in range(20):
+            q = rnd.randrange(n)
+            dfa.add_transition(q, rnd.choice(symbols), rnd.randrange(q, n) if acyclic else rnd.randrange(n))
+            expected = fresh(dfa)
+            assert dfa.is_language_empty() == expected.is_language_empty()
+            assert dfa.is_language_infinite() == expected.is_language_infinite()
+            minimal, mapping = dfa.minimize(return_mapping=True)
+            expected_minimal, expected_mapping = expected.minimize(return_mapping=True)
+            assert mapping == expected_mapping
+            assert minimal.transitions == expected_minimal.transitions
+            assert minimal.accept_states == expected_minimal.accept_states